@@ -0,0 +1 @@
+# Makes the project root importable from the tests, e.g. `import src.tools`.
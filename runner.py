@@ -1,17 +1,13 @@
 import sys
+import src.datasets as datasets
 import src.tools as tools
-from src import NEEDS_UPDATING_lpj_guess_dataset
-from src import cte_hr_dataset
-from src import gcp_inversions_dataset
-from src import remote_sensing_dataset
-from src import vprm_dataset
 
 if __name__ == '__main__':
-    if len(sys.argv) == 2:
+    if len(sys.argv) >= 2:
         skipping_handlers = tools.parse_arguments(sys.argv[1])
     else:
         # Bit handler 1: archive files.
-        # Bit handler 2: fill handlers.
+        # Bit handler 2: plan stages.
         # Bit handler 3: try-ingest files.
         # Bit handler 4: archive json.
         # Bit handler 5: upload meta-data.
@@ -21,29 +17,11 @@ if __name__ == '__main__':
         static_mode = '1111111'
         static_mode = '1101110'
         skipping_handlers = tools.parse_arguments(static_mode)
-    # LPJ-GUESS
-    # my_class = lpj_guess_dataset.LpjGuessDataset(
-    #     reason='lpj_guess_global').one_shot(skipping_handlers)
-
-    # CTE-HR
-    # my_class = cte_hr_dataset.CteHrDataset(
-    #     reason='cte_hr').one_shot(skipping_handlers)
-
-    # REMOTE-SENSING MODIS
-    # my_class = remote_sensing_dataset.RemoteSensingDataset(
-    #     reason='modis').one_shot(skipping_handlers)
-
-    # REMOTE-SENSING Landsat
-    # my_class = remote_sensing_dataset.RemoteSensingDataset(
-    #     reason='landsat').one_shot(skipping_handlers)
-
-    # GCP-INVERSIONS
-    # my_class = gcp_inversions_dataset.GcpInversionsDataset(
-    #     reason='gcp_inversion').one_shot(skipping_handlers)
-
-    # GCP-INVERSIONS
-    my_class = vprm_dataset.VprmDataset(
-        reason='vprm').one_shot(skipping_handlers)
+    # Reason of the dataset to upload, one of datasets.DATASETS:
+    # cte_hr, gcp_inversion, landsat, lpj_guess_global, modis.
+    # Its module is only imported now, see src/datasets.py.
+    reason = sys.argv[2] if len(sys.argv) == 3 else 'cte_hr'
+    my_class = datasets.get_dataset(reason=reason).one_shot(skipping_handlers)
 
 
     # skipping_handlers = tools.parse_arguments(sys.argv[1])
@@ -7,11 +7,11 @@
 # import json
 import os
 import re
+import time
 
 # Related third party imports.
 # import humanize
 import requests
-import xarray
 
 # Local application/library specific imports.
 import src.constants as constants
@@ -54,8 +54,7 @@ class LpjGuessDataset(dataset.Dataset):
 
     def build_try_ingest_components(self, file_path: str = None) -> dict:
         """Build the try-ingest command for each data file."""
-        xarray_dataset = xarray.open_dataset(file_path)
-        variable_list = list(xarray_dataset.data_vars)
+        variable_list = self.get_header(file_path=file_path)['data_vars']
         # The variable list must be formatted like this:
         # '["variable_1", "variable_2", ...]'
         # Formatting like this e.g: "['variable_1', 'variable_2', ...]"
@@ -72,10 +71,14 @@ class LpjGuessDataset(dataset.Dataset):
     @staticmethod
     def execute_item(try_ingest_components: dict = None) -> dict:
         """Used from processes spawned by try_ingest()."""
-        try_ingest_response = requests.put(url=try_ingest_components['url'],
-                                           data=open(file=try_ingest_components['file_path'], mode='rb'),
-                                           params=try_ingest_components['params'])
-        return {'status_code': try_ingest_response.status_code, 'text': try_ingest_response.text}
+        start_time = time.monotonic()
+        with tools.MappedFileBody(file_path=try_ingest_components['file_path']) as data:
+            try_ingest_response = tools.get_session().put(url=try_ingest_components['url'],
+                                                          data=data,
+                                                          params=try_ingest_components['params'])
+        return {'status_code': try_ingest_response.status_code, 'text': try_ingest_response.text,
+                'file_name': try_ingest_components['file_path'].split('/')[-1],
+                'latency': time.monotonic() - start_time}
 
     def archive_json(self):
         """Generates standalone .json files and adds to archive.
@@ -93,7 +96,7 @@ class LpjGuessDataset(dataset.Dataset):
         for base_key, base_info in self.archive_out.items():
             if not base_info['handlers']['archive_json']:
                 continue
-            xarray_dataset = xarray.open_dataset(base_info['file_path'])
+            header = self.get_header(file_path=base_info['file_path'])
             base_info['json'] = dict({
                 'fileName': base_info['file_name'],
                 'hashSum': self.get_hash_sum(file_path=base_info['file_path']),
@@ -147,8 +150,8 @@ class LpjGuessDataset(dataset.Dataset):
                     # 'spatial': 'http://meta.icos-cp.eu/resources/latlonboxes/lpjGuessEuropeLatLonBox',
                     'temporal': {
                         'interval': {
-                            'start': xarray_dataset.time[0].dt.strftime('%Y-%m-%dT%H:%M:%SZ').item(),
-                            'stop': xarray_dataset.time[-1].dt.strftime('%Y-%m-%dT%H:%M:%SZ').item(),
+                            'start': header['time_start'],
+                            'stop': header['time_stop'],
                         },
                         'resolution': 'hourly'
                     },
@@ -158,7 +161,7 @@ class LpjGuessDataset(dataset.Dataset):
                              f'(generated in 2021)',
                     # LPJ-GUESS Europe title.
                     # 'title': f'LPJ-GUESS Europe hourly {base_info["variable"].upper()} for {base_info["year"]}',
-                    'variables': [variable for variable in xarray_dataset.data_vars],
+                    'variables': header['data_vars'],
                 },
                 'submitterId': 'CP'
             })
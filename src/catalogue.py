@@ -0,0 +1,248 @@
+# Format read from https://peps.python.org/pep-0008/#imports.
+# Standard library imports.
+import sqlite3
+import time
+
+# Related third party imports.
+# icoscp is imported by the functions that query the SPARQL endpoint.
+import pandas
+import requests
+
+# Local application/library specific imports.
+import src.constants as constants
+
+
+# Local catalogue of the latest version of every collection on the
+# Carbon Portal. Runs read it instead of querying the SPARQL endpoint,
+# until it is older than its time-to-live. It is then refreshed
+# incrementally: only collections issued after the most recent issue
+# date in the catalogue (its high-water mark) are queried, and the
+# collections they are a next version of are dropped.
+PREFIXES = '''
+    prefix cpmeta: <http://meta.icos-cp.eu/ontologies/cpmeta/>
+    prefix dcterms: <http://purl.org/dc/terms/>
+    prefix xsd: <http://www.w3.org/2001/XMLSchema#>
+'''
+FULL_QUERY = PREFIXES + '''
+    select ?coll ?title ?issued where{
+        ?coll a cpmeta:Collection .
+        OPTIONAL{?coll cpmeta:hasDoi ?doi}
+        ?coll dcterms:title ?title .
+        OPTIONAL{?coll dcterms:issued ?issued}
+        FILTER NOT EXISTS {[] cpmeta:isNextVersionOf ?coll}
+        OPTIONAL{?coll cpmeta:hasCitationString ?citation}
+        OPTIONAL{?doc cpmeta:hasBiblioInfo ?bibinfo}
+        FILTER(STRSTARTS(str(?coll), "https://meta.icos-cp.eu/"))
+    }
+    order by ?title
+'''
+INCREMENTAL_QUERY = PREFIXES + '''
+    select ?coll ?title ?issued ?previous where{{
+        ?coll a cpmeta:Collection .
+        ?coll dcterms:title ?title .
+        ?coll dcterms:issued ?issued .
+        FILTER(?issued > "{high_water_mark}"^^xsd:dateTime)
+        FILTER NOT EXISTS {{[] cpmeta:isNextVersionOf ?coll}}
+        OPTIONAL{{?coll cpmeta:isNextVersionOf ?previous}}
+        FILTER(STRSTARTS(str(?coll), "https://meta.icos-cp.eu/"))
+    }}
+'''
+# Number of collections per contents query.
+CONTENTS_BATCH_SIZE = 50
+CONTENTS_QUERY = PREFIXES + '''
+    select ?coll ?title ?description ?member where{{
+        VALUES ?coll {{ {collections} }}
+        ?coll dcterms:title ?title .
+        OPTIONAL{{?coll dcterms:description ?description}}
+        ?coll dcterms:hasPart ?member .
+    }}
+'''
+
+
+def connect_catalogue(catalogue_path: str = None) -> sqlite3.Connection:
+    """Open (and create if needed) the sqlite collection catalogue."""
+    connection = sqlite3.connect(catalogue_path)
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS collections ('
+        'coll TEXT PRIMARY KEY, '
+        'title TEXT, '
+        'issued TEXT)'
+    )
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS catalogue ('
+        'key TEXT PRIMARY KEY, '
+        'value TEXT)'
+    )
+    return connection
+
+
+def read_state(connection: sqlite3.Connection = None) -> dict:
+    """Return when the catalogue was refreshed and its high-water mark."""
+    state = dict(connection.execute(
+        'SELECT key, value FROM catalogue').fetchall())
+    return dict({
+        'refreshed_at': float(state.get('refreshed_at', 0)),
+        'high_water_mark': state.get('high_water_mark')
+    })
+
+
+def store_collections(connection: sqlite3.Connection = None,
+                      df_collections: pandas.DataFrame = None):
+    """Insert or replace queried collections and update the state."""
+    rows = [
+        (row.coll, row.title, row.issued if pandas.notna(row.issued) else None)
+        for row in df_collections.drop_duplicates(
+            subset='coll').itertuples(index=False)
+    ]
+    connection.executemany(
+        'INSERT OR REPLACE INTO collections (coll, title, issued) '
+        'VALUES (?, ?, ?)', rows
+    )
+    high_water_mark = connection.execute(
+        'SELECT MAX(issued) FROM collections').fetchone()[0]
+    connection.executemany(
+        'INSERT OR REPLACE INTO catalogue (key, value) VALUES (?, ?)',
+        [('refreshed_at', str(time.time())),
+         ('high_water_mark', high_water_mark)]
+    )
+    return
+
+
+def run_query(sparql_query: str = None) -> pandas.DataFrame:
+    """
+    Run a SPARQL query and return its result.
+
+    Returns None if the query failed: if the endpoint could not be
+    reached, or if it answered with an error, in which case RunSparql
+    returns whether the response was ok and its reason instead of a
+    data frame.
+    """
+    from icoscp.sparql.runsparql import RunSparql
+    try:
+        result = RunSparql(sparql_query=sparql_query,
+                           output_format='pandas').run()
+    except requests.exceptions.RequestException as e:
+        print(f'\tSPARQL query failed: {e}')
+        return None
+    if not isinstance(result, pandas.DataFrame):
+        print(f'\tSPARQL query failed: {result}')
+        return None
+    return result
+
+
+def refresh_full(connection: sqlite3.Connection = None) -> bool:
+    """
+    Replace the catalogue with the result of the full query.
+
+    Returns False, leaving the catalogue as it was, if the query failed.
+    """
+    df_collections = run_query(sparql_query=FULL_QUERY)
+    if df_collections is None:
+        return False
+    if 'issued' not in df_collections.columns:
+        df_collections['issued'] = None
+    connection.execute('DELETE FROM collections')
+    store_collections(connection=connection,
+                      df_collections=df_collections)
+    return True
+
+
+def refresh_incremental(connection: sqlite3.Connection = None,
+                        high_water_mark: str = None) -> bool:
+    """
+    Add collections issued after the high-water mark.
+
+    Returns False, leaving the catalogue as it was, if the query failed.
+    """
+    df_collections = run_query(sparql_query=INCREMENTAL_QUERY.format(
+        high_water_mark=high_water_mark))
+    if df_collections is None:
+        return False
+    if not df_collections.empty:
+        if 'previous' in df_collections.columns:
+            connection.executemany(
+                'DELETE FROM collections WHERE coll = ?',
+                [(previous,) for previous
+                 in df_collections.previous.dropna().unique()]
+            )
+        store_collections(connection=connection,
+                          df_collections=df_collections)
+    else:
+        connection.execute(
+            'INSERT OR REPLACE INTO catalogue (key, value) VALUES (?, ?)',
+            ('refreshed_at', str(time.time()))
+        )
+    return True
+
+
+def get_collections(catalogue_path: str = constants.P_COLLECTION_CATALOGUE,
+                    ttl: float = constants.COLLECTION_CATALOGUE_TTL,
+                    refresh: str = None) -> pandas.DataFrame:
+    """
+    Return the latest version of all collections, ordered by title.
+
+    The catalogue is refreshed when it is older than `ttl` seconds:
+    incrementally if it has a high-water mark, in full otherwise.
+    `refresh` forces a refresh, either 'incremental' or 'full'. If the
+    refresh fails the stale catalogue is used, and retried next time;
+    zupload exits if there is no catalogue to fall back to.
+    """
+    with connect_catalogue(catalogue_path=catalogue_path) as connection:
+        state = read_state(connection=connection)
+        if refresh is None and \
+                time.time() - state['refreshed_at'] > ttl:
+            refresh = 'incremental'
+        if refresh == 'incremental' and state['high_water_mark'] is None:
+            refresh = 'full'
+        refreshed = True
+        if refresh == 'full':
+            refreshed = refresh_full(connection=connection)
+        elif refresh == 'incremental':
+            refreshed = refresh_incremental(
+                connection=connection,
+                high_water_mark=state['high_water_mark'])
+        if not refreshed:
+            if state['refreshed_at'] == 0:
+                exit('Unable to download collections and there is no '
+                     'local catalogue to fall back to. Exiting...')
+            print(f'\tUsing the catalogue of '
+                  f'{time.ctime(state["refreshed_at"])}.')
+        df_collections = pandas.read_sql(
+            'SELECT coll, title FROM collections ORDER BY title',
+            connection)
+    connection.close()
+    return df_collections
+
+
+def get_collection_contents(collections: list = None,
+                            batch_size: int = CONTENTS_BATCH_SIZE) -> dict:
+    """
+    Return title, description and members of the given collections.
+
+    Collections are queried `batch_size` at a time, since the query is
+    sent in the url. Collections missing from the Carbon Portal are
+    left out. Members are sorted, since the order they were uploaded in
+    is not kept. Returns None if any of the queries failed.
+    """
+    contents = dict()
+    for start in range(0, len(collections or list()), batch_size):
+        df_contents = run_query(sparql_query=CONTENTS_QUERY.format(
+            collections=' '.join(
+                f'<{collection}>'
+                for collection in collections[start:start + batch_size])))
+        if df_contents is None:
+            return None
+        if df_contents.empty:
+            continue
+        if 'description' not in df_contents.columns:
+            df_contents['description'] = None
+        for collection, df_collection in \
+                df_contents.groupby('coll', sort=False):
+            description = df_collection.description.iloc[0]
+            contents[collection] = dict({
+                'title': df_collection.title.iloc[0],
+                'description':
+                    description if pandas.notna(description) else None,
+                'members': sorted(df_collection.member.unique().tolist())
+            })
+    return contents
@@ -0,0 +1,232 @@
+# Format read from https://peps.python.org/pep-0008/#imports.
+# Standard library imports.
+import os
+
+# Related third party imports.
+
+# Local application/library specific imports.
+import src.catalogue as catalogue
+import src.collection_uploader as collection_uploader
+import src.constants as constants
+import src.planner as planner
+import src.tools as tools
+
+
+# Collections are built bottom-up through a hierarchy of levels, e.g.
+# monthly -> yearly -> full. A level is a dictionary holding:
+#   name    key of the level in the state and in `current`,
+#   group   function mapping a member's key to its collection's key,
+#   render  function(key, members, previous) returning the title,
+#           description and members of a collection, or None if it
+#           cannot be rendered. `previous` is the content of the
+#           collection's latest version, or None.
+# The first level groups archive entries by their keys; each next level
+# groups the collections of the level below it, referencing their
+# latest versions. The state records per level and collection key:
+#   {"versions": [url, ...], "hash": content_hash()}
+# A collection is uploaded again only if its content hash changed, so
+# a new month touches one monthly, one yearly and the full collection.
+
+
+def content_hash(content: dict = None) -> str:
+    """
+    Return a hash of what identifies a collection's version.
+
+    That is its title, description and set of members; the previous
+    version it points to and the order of members are left out.
+    """
+    return planner.json_hash(content=dict({
+        'title': content.get('title'),
+        'description': content.get('description'),
+        'members': sorted(content['members'])
+    }))
+
+
+def read_state(state_path: str = None) -> dict:
+    """Read the collection state, or return an empty one if missing."""
+    if not os.path.exists(state_path):
+        return dict()
+    return tools.read_json(path=state_path)
+
+
+def get_json_file_path(files_path: str = None, key: str = None) -> str:
+    """Return where the json of a collection is written."""
+    return os.path.join(files_path, f'{key}.json')
+
+
+def read_previous(files_path: str = None, key: str = None) -> dict:
+    """Return the content of a collection's latest version, if known."""
+    json_file_path = get_json_file_path(files_path=files_path, key=key)
+    if not os.path.exists(json_file_path):
+        return None
+    return tools.read_json(path=json_file_path)
+
+
+def seed_state(level_state: dict = None, current: dict = None,
+               files_path: str = None) -> set:
+    """
+    Record collections whose latest version was not built here.
+
+    `current` maps collection keys to the url of their latest version
+    on the Carbon Portal. Collections uploaded by hand, or before the
+    state existed, are read from the Carbon Portal once, so that they
+    are only uploaded again if they actually changed. Collections whose
+    content could not be read are recorded without a hash, so that a
+    new version of them is built; their keys are returned, since their
+    records must not be kept unless that version is uploaded. Returns
+    None if the Carbon Portal could not be queried.
+    """
+    unknown = dict({
+        key: collection_url for key, collection_url in current.items()
+        if collection_url not in level_state.get(key, dict()).get(
+            'versions', list())
+    })
+    if not unknown:
+        return set()
+    contents = catalogue.get_collection_contents(
+        collections=list(unknown.values()))
+    if contents is None:
+        return None
+    unread = set()
+    for key, collection_url in unknown.items():
+        content = contents.get(collection_url)
+        level_state[key] = dict({
+            'versions': [collection_url],
+            'hash': None if content is None else
+            content_hash(content=content)
+        })
+        if content is None:
+            unread.add(key)
+            continue
+        tools.write_json(
+            path=get_json_file_path(files_path=files_path, key=key),
+            content=content)
+    return unread
+
+
+def write_state(state_path: str = None, state: dict = None,
+                unread: dict = None):
+    """Write the state, leaving out records of unread collections."""
+    tools.write_json(path=state_path, content=dict({
+        level_name: dict({
+            key: record for key, record in level_state.items()
+            if key not in unread.get(level_name, set())
+        })
+        for level_name, level_state in state.items()
+    }))
+    return
+
+
+def group_members(members: dict = None, group=None) -> dict:
+    """
+    Group members by the key of their collection.
+
+    `members` maps keys to member urls. Members are ordered by their
+    keys within each collection.
+    """
+    groups = dict()
+    for member_key in sorted(members.keys()):
+        groups.setdefault(group(member_key), list()).append(
+            members[member_key])
+    return groups
+
+
+def render_level(level: dict = None, level_state: dict = None,
+                 members: dict = None, files_path: str = None) -> dict:
+    """
+    Render the collections of a level and write those that changed.
+
+    Returns the changed collections, keyed by collection key, with
+    their json file path and content hash.
+    """
+    changed = dict()
+    for key, collection_members in group_members(
+            members=members, group=level['group']).items():
+        record = level_state.get(key, dict())
+        content = level['render'](
+            key=key, members=collection_members,
+            previous=read_previous(files_path=files_path, key=key))
+        if content is None:
+            print(f'\t{level["name"]} {key}: cannot be rendered, skipped.')
+            continue
+        hash_sum = content_hash(content=content)
+        if hash_sum == record.get('hash'):
+            continue
+        versions = record.get('versions', list())
+        json_file_path = get_json_file_path(files_path=files_path, key=key)
+        tools.write_json(path=json_file_path, content=dict({
+            'description': content['description'],
+            'members': content['members'],
+            'submitterId': constants.STANDARD_SUBMITTER,
+            'title': content['title'],
+            'isNextVersionOf': versions[-1].rsplit('/')[-1]
+            if versions else []
+        }))
+        changed[key] = dict({'json_file_path': json_file_path,
+                             'hash': hash_sum})
+    return changed
+
+
+def build_collections(archive: dict = None, levels: list = None,
+                      current: dict = None, state_path: str = None,
+                      files_path: str = None) -> list:
+    """
+    Build and upload the collections of an archive that changed.
+
+    Archive entries without a `file_metadata_url` are not uploaded yet
+    and are left out. `current` maps level names to the collections of
+    that level found on the Carbon Portal, see seed_state(). Levels are
+    uploaded in order and new versions are recorded in the state as
+    they arrive. Returns the failed uploads; levels above a failed one
+    are not built. Nothing is built at a level whose current collections
+    could not be read.
+    """
+    state = read_state(state_path=state_path)
+    os.makedirs(files_path, exist_ok=True)
+    members = dict({
+        base_key: base_info['file_metadata_url']
+        for base_key, base_info in archive.items()
+        if 'file_metadata_url' in base_info.keys()
+    })
+    # Keys of seeded collections whose content could not be read.
+    unread = dict()
+    for level in levels:
+        level_state = state.setdefault(level['name'], dict())
+        unread[level['name']] = seed_state(
+            level_state=level_state,
+            current=current.get(level['name'], dict()),
+            files_path=files_path)
+        if unread[level['name']] is None:
+            print(f'\tUnable to read the current {level["name"]} '
+                  f'collections; nothing was built.')
+            return [dict({
+                'collection': level['name'],
+                'status_code': None,
+                'text': 'Unable to read the current collections from the '
+                        'Carbon Portal; nothing was built.'
+            })]
+        changed = render_level(level=level, level_state=level_state,
+                               members=members, files_path=files_path)
+        print(f'- {constants.ICON_GEAR:3}Uploading {level["name"]} '
+              f'collections... (Expecting {len(changed)} checks)... ')
+
+        def record_version(collection_key, response):
+            record = level_state.setdefault(
+                collection_key, dict({'versions': list()}))
+            record['versions'].append(
+                collection_uploader.get_collection_url(response.text.strip()))
+            record['hash'] = changed[collection_key]['hash']
+            unread[level['name']].discard(collection_key)
+            write_state(state_path=state_path, state=state, unread=unread)
+
+        errors = collection_uploader.upload_collections(
+            collections=changed, on_upload=record_version)
+        write_state(state_path=state_path, state=state, unread=unread)
+        if errors:
+            return errors
+        # Parents reference the latest version of each child.
+        members = dict({
+            key: record['versions'][-1]
+            for key, record in level_state.items() if record['versions']
+        })
+    return list()
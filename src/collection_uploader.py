@@ -0,0 +1,111 @@
+# Format read from https://peps.python.org/pep-0008/#imports.
+# Standard library imports.
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Related third party imports.
+import requests
+
+# Local application/library specific imports.
+import src.constants as constants
+import src.tools as tools
+
+
+COLLECTIONS_URL = 'https://meta.icos-cp.eu/collections/'
+
+
+def get_collection_url(version: str = None) -> str:
+    """Return the landing page of a collection given its url or id."""
+    if version.startswith('https://'):
+        return version
+    return f'{COLLECTIONS_URL}{version}'
+
+
+def post_collection(json_file_path: str = None, cookies=None,
+                    rate_limiter: tools.AdaptiveRateLimiter = None,
+                    retries: int = constants.REQUEST_RETRIES) \
+        -> requests.Response:
+    """
+    Used from threads spawned by upload_collections().
+
+    Collections are identified by their content, so posting one again
+    after a failed attempt is safe. Throttled or failed posts are
+    retried up to `retries` times; the rate limiter slows down on each
+    of them. Returns the last response.
+    """
+    with open(file=json_file_path, mode='rb') as json_handle:
+        payload = json_handle.read()
+    for attempt in range(retries + 1):
+        rate_limiter.acquire()
+        try:
+            response = tools.get_session().post(
+                url=constants.META_DATA_UPLOAD_URL,
+                data=payload,
+                headers={'Content-Type': 'application/json'},
+                cookies=cookies,
+                timeout=constants.REQUEST_TIMEOUT
+            )
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout):
+            rate_limiter.feedback(status_code=None)
+            if attempt == retries:
+                raise
+            continue
+        rate_limiter.feedback(status_code=response.status_code)
+        if response.status_code not in constants.RETRY_STATUS_CODES:
+            break
+    return response
+
+
+def upload_collections(collections: dict = None, on_upload=None,
+                       workers: int = constants.COLLECTION_UPLOAD_WORKERS) \
+        -> list:
+    """
+    Upload collections concurrently.
+
+    `collections` maps a key to a dictionary holding the collection's
+    `json_file_path`. At most `workers` uploads are in flight; the rate
+    uploads are started at adapts to the server's responses, see
+    tools.AdaptiveRateLimiter. `on_upload(key, response)` is called
+    from the calling thread as soon as each collection is uploaded, so
+    that new versions can be recorded as they arrive. Returns the
+    failed uploads.
+    """
+    cookies = tools.load_cookie()
+    rate_limiter = tools.AdaptiveRateLimiter(
+        rate=constants.COLLECTION_UPLOAD_RATE,
+        min_rate=constants.COLLECTION_UPLOAD_MIN_RATE,
+        max_rate=constants.COLLECTION_UPLOAD_MAX_RATE,
+        increase=constants.COLLECTION_UPLOAD_RATE_INCREASE
+    )
+    errors = list()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                post_collection,
+                json_file_path=collection_info['json_file_path'],
+                cookies=cookies,
+                rate_limiter=rate_limiter
+            ): collection_key
+            for collection_key, collection_info in collections.items()
+        }
+        for future in as_completed(futures):
+            collection_key = futures[future]
+            try:
+                response = future.result()
+            except requests.exceptions.RequestException as e:
+                errors.append(dict({'collection': collection_key,
+                                    'status_code': None,
+                                    'text': str(e)}))
+                continue
+            if response.status_code == 200:
+                print(f'\t{collection_key}: {response.text}')
+                if on_upload is not None:
+                    on_upload(collection_key, response)
+            else:
+                errors.append(dict({'collection': collection_key,
+                                    'status_code': response.status_code,
+                                    'text': response.text}))
+    for error in errors:
+        print(f'\t{error["collection"]}: {error["status_code"]} '
+              f'{error["text"]}')
+    return errors
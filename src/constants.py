@@ -1,4 +1,49 @@
+import os
+
 COOKIES = 'cookies.txt'
+# Shared http session: number of per-host connection pools to keep and
+# maximum number of keep-alive connections per host.
+HTTP_POOL_CONNECTIONS = 10
+HTTP_POOL_MAXSIZE = 16
+# Concurrent meta-data uploads: number of uploads in flight and maximum
+# number of uploads started per second.
+META_DATA_UPLOAD_WORKERS = 4
+META_DATA_UPLOAD_RATE = 5
+# Concurrent data uploads: number of files uploaded at once and the
+# order they are scheduled in (largest_first, smallest_first, archive).
+DATA_UPLOAD_WORKERS = 4
+DATA_UPLOAD_ORDER = 'largest_first'
+# Size of the blocks data files are sent in (8 MiB).
+UPLOAD_BLOCK_SIZE = 8 * 2**20
+# GET requests: time-out in seconds, number of retries, seconds waited
+# before the first retry (doubled on each next one) and status codes
+# worth retrying.
+REQUEST_TIMEOUT = 60
+REQUEST_RETRIES = 3
+REQUEST_BACKOFF = 1
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+# Status codes telling that the server is overloaded.
+THROTTLE_STATUS_CODES = [429, 503]
+# Concurrent collection uploads: number of uploads in flight, initial,
+# minimum and maximum uploads started per second, and how much the
+# rate grows with each successful upload.
+COLLECTION_UPLOAD_WORKERS = 4
+COLLECTION_UPLOAD_RATE = 2
+COLLECTION_UPLOAD_MIN_RATE = 0.2
+COLLECTION_UPLOAD_MAX_RATE = 10
+COLLECTION_UPLOAD_RATE_INCREASE = 0.5
+# Number of json documents (e.g. meta.json) fetched at once.
+DOCUMENT_FETCH_WORKERS = 16
+# Upload progress is journaled every time this many bytes are sent.
+UPLOAD_CHECKPOINT_INTERVAL = 256 * 2**20
+# The archive journal is folded into the json archive once it holds
+# more than this many entries.
+JOURNAL_COMPACTION_RECORDS = 5000
+# Read buffer used when calculating hash-sums (8 MiB).
+HASH_BUFFER_SIZE = 8 * 2**20
+# Number of zip archives built at once. Kept low since zipping is
+# bound by disk I/O rather than by cpu.
+ZIP_PROCESSES = 2
 ICON_ARCHIVE = '\U0001F4DA'
 ICON_ARROW = '\u2192'
 ICON_ARROW_DOWN_RIGHT = '\U000021AA'
@@ -27,7 +72,27 @@ OBJECT_SPECS = {
     'model_data_archive': 'http://meta.icos-cp.eu/resources/cpmeta/modelDataArchive'
 }
 REST_COUNTRIES = 'https://restcountries.com/v3.1/all'
+REST_COUNTRIES_ALPHA = 'https://restcountries.com/v3.1/alpha'
+# Rest countries file written by older runs; imported into the country
+# index if the index is empty.
 P_REST_COUNTRIES = 'input-files/rest_countries.json'
+# Country index shipped with the project and the countries fetched at
+# run time on top of it, see src/countries.py.
+P_COUNTRY_INDEX = os.path.join(os.path.dirname(__file__),
+                               'country_index.json')
+P_COUNTRY_ADDITIONS = 'input-files/country_index_additions.json'
+# Local catalogue of the Carbon Portal's collections and the number of
+# seconds before it is refreshed.
+P_COLLECTION_CATALOGUE = 'input-files/collections.sqlite'
+COLLECTION_CATALOGUE_TTL = 24 * 3600
+# Collections built by src/collection_builder.py: the versions and
+# content hashes recorded for each CTE-HR collection and the folder its
+# rendered json files are written to.
+P_CTE_HR_COLLECTION_STATE = 'input-files/cte-hr/collections.json'
+P_CTE_HR_COLLECTION_FILES = 'input-files/json-standalone-collection-files'
+NOMINATIM_SEARCH = 'https://nominatim.openstreetmap.org/search'
+# Maximum number of nominatim requests per second (usage policy).
+NOMINATIM_RATE = 1
 # People
 AUKE_WOUDE = 'http://meta.icos-cp.eu/resources/people/Auke_van_der_Woude'
 BO_ZHENG = 'http://meta.icos-cp.eu/resources/people/BoZheng'
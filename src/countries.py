@@ -0,0 +1,249 @@
+# Format read from https://peps.python.org/pep-0008/#imports.
+# Standard library imports.
+import json
+import os
+
+# Related third party imports.
+
+# Local application/library specific imports.
+import src.constants as constants
+import src.tools as tools
+
+
+# The country index maps cca2 country codes (GB is UK) to the fields
+# below, stored as one compact json list per country:
+#   {"version": 1, "countries": {"SE": ["Sweden", "Europe", ...], ...}}
+# It ships with the project, so that remote sensing runs never wait on
+# rate-limited requests, and is only written by running this module.
+# Countries missing from it are fetched once at run time and written
+# to a separate index of additions, which is merged into it on read.
+INDEX_VERSION = 1
+INDEX_FIELDS = ['name', 'continent', 'bounding_box_from',
+                'min_lat', 'max_lat', 'min_lon', 'max_lon']
+CONTINENT_POSSESSION = dict({
+    'Africa': 'African',
+    'Americas': 'American',
+    'Antarctic': 'Antarctic',
+    'Asia': 'Asian',
+    'Eurasia': 'Eurasian',
+    'Europe': 'European',
+    'Oceania': 'Oceanian'
+})
+
+# Process-wide index, see get_countries().
+country_index = None
+
+
+def expand_country(values: list = None) -> dict:
+    """Turn an index row into a country's dictionary."""
+    country = dict(zip(INDEX_FIELDS, values))
+    country['continent_possession'] = \
+        CONTINENT_POSSESSION[country['continent']]
+    return country
+
+
+def read_index(index_path: str = constants.P_COUNTRY_INDEX) -> dict:
+    """Read the country index, or return an empty one if missing."""
+    if not os.path.exists(index_path):
+        return dict()
+    with open(file=index_path, mode='r') as index_handle:
+        index = json.load(index_handle)
+    if index.get('version') != INDEX_VERSION:
+        return dict()
+    return dict({
+        country_code: expand_country(values=values)
+        for country_code, values in index['countries'].items()
+    })
+
+
+def read_countries() -> dict:
+    """Read the shipped country index merged with its additions."""
+    countries = read_index(index_path=constants.P_COUNTRY_INDEX)
+    countries.update(read_index(index_path=constants.P_COUNTRY_ADDITIONS))
+    return countries
+
+
+def write_index(countries: dict = None,
+                index_path: str = constants.P_COUNTRY_ADDITIONS):
+    """Replace a country index atomically."""
+    os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+    p_temporary = f'{index_path}.tmp'
+    with open(file=p_temporary, mode='w') as index_handle:
+        json.dump(dict({
+            'version': INDEX_VERSION,
+            'countries': dict({
+                country_code: [country[field] for field in INDEX_FIELDS]
+                for country_code, country in sorted(countries.items())
+            })
+        }), index_handle, separators=(',', ':'))
+        index_handle.write('\n')
+    os.replace(p_temporary, index_path)
+    return
+
+
+def parse_country(country: dict = None) -> tuple:
+    """
+    Return the code, name, continent and nominatim name of a country
+    from its restcountries content.
+
+    Returns None for anything else, e.g. the error restcountries
+    answers with for unknown codes.
+    """
+    if not isinstance(country, dict) or 'cca2' not in country.keys():
+        return None
+    country_code = country['cca2']
+    if country_code == 'GB':
+        country_code = 'UK'
+    country_name = country['name']['common']
+    country_continent = country['region']
+    # Svalbard and Jan is under the full sovereignty of Norway.
+    if country_code == 'SJ':
+        country_name_nominatim = 'Norway'
+    elif country_code == 'GF':
+        country_name_nominatim = 'France'
+    elif country_code == 'RU':
+        country_name_nominatim = country_name
+        country_continent = 'Eurasia'
+    else:
+        country_name_nominatim = country_name
+    return country_code, country_name, country_continent, \
+        country_name_nominatim
+
+
+def fetch_countries(country_codes: set = None) -> list:
+    """
+    Download restcountries content of given countries only.
+
+    Downloads all countries if `country_codes` is None. Only countries
+    that could be parsed are returned.
+    """
+    if country_codes is None:
+        args = {'url': constants.REST_COUNTRIES}
+    else:
+        args = {'url': constants.REST_COUNTRIES_ALPHA,
+                'params': {'codes': ','.join(sorted(
+                    'GB' if country_code == 'UK' else country_code
+                    for country_code in country_codes))}}
+    downloaded = tools.handle_request(request='get', args=args).json()
+    if not isinstance(downloaded, list):
+        downloaded = [downloaded]
+    return [country for country in downloaded
+            if parse_country(country=country) is not None]
+
+
+def fetch_bounding_box(country_name_nominatim: str = None) -> list:
+    """Request a country's bounding box from nominatim; can be empty."""
+    args = {'url': constants.NOMINATIM_SEARCH,
+            'params': {'country': country_name_nominatim,
+                       'format': 'json',
+                       'polygon': 0}}
+    country_coordinates = \
+        tools.handle_request(request='get', args=args).json()
+    return country_coordinates[0]['boundingbox'] \
+        if country_coordinates else []
+
+
+def update_index(country_codes: set = None, countries: dict = None,
+                 index_path: str = constants.P_COUNTRY_ADDITIONS) -> dict:
+    """
+    Add missing countries to the index and return it.
+
+    Only countries in `country_codes` (all countries if None) that are
+    not in `countries` (the merged index by default) yet are
+    downloaded. They are added to `countries` and to the index at
+    `index_path`, which is written after each country, so an
+    interrupted update keeps what was fetched.
+    According to nominatim's usage policy there is an absolute maximum
+    of 1 request per second for bounding boxes.
+    """
+    if countries is None:
+        countries = read_countries()
+    if country_codes is not None:
+        country_codes = set(country_codes) - set(countries.keys())
+        if not country_codes:
+            return countries
+    downloaded_countries = [
+        country for country in fetch_countries(country_codes=country_codes)
+        if parse_country(country=country)[0] not in countries.keys()
+    ]
+    if country_codes is not None:
+        unknown_codes = country_codes - set(
+            parse_country(country=country)[0]
+            for country in downloaded_countries)
+        if unknown_codes:
+            print(f'\tUnknown country codes: '
+                  f'{", ".join(sorted(unknown_codes))}')
+    if not downloaded_countries:
+        return countries
+    download_boxes = tools.input_handler(
+        operation='download_rest_countries',
+        additional_info=dict({'countries': len(downloaded_countries)})
+    ) == 'Y'
+    added_countries = read_index(index_path=index_path)
+    rate_limiter = tools.RateLimiter(rate=constants.NOMINATIM_RATE)
+    total = len(downloaded_countries)
+    for index, country in enumerate(downloaded_countries):
+        country_code, country_name, country_continent, \
+            country_name_nominatim = parse_country(country=country)
+        bounding_box = []
+        if download_boxes:
+            rate_limiter.acquire()
+            bounding_box = fetch_bounding_box(
+                country_name_nominatim=country_name_nominatim)
+        # Nominatim orders boxes as min_lat, max_lat, min_lon, max_lon.
+        coordinates = [float(coordinate) for coordinate in bounding_box] \
+            if bounding_box else 4 * [None]
+        countries[country_code] = expand_country(values=[
+            country_name,
+            country_continent,
+            country_name_nominatim,
+            *coordinates
+        ])
+        added_countries[country_code] = countries[country_code]
+        write_index(countries=added_countries, index_path=index_path)
+        tools.progress_bar(operation='download_rest_countries',
+                           current=index+1,
+                           total=total)
+    return countries
+
+
+def import_rest_countries(
+        rest_countries_path: str = constants.P_REST_COUNTRIES) -> dict:
+    """Read countries from a rest countries file of older runs."""
+    rest_countries = tools.read_json(path=rest_countries_path)
+    return dict({
+        country_code: expand_country(values=[
+            country[field] for field in INDEX_FIELDS
+        ])
+        for country_code, country in rest_countries.items()
+    })
+
+
+def get_countries(country_codes: set = None) -> dict:
+    """
+    Return the country index, keyed by country code.
+
+    The index is read once per process. Countries in `country_codes`
+    missing from it are downloaded and added to its additions. A rest
+    countries file left by older runs is imported into the additions
+    if the index is empty. Callers should pass every code they look up,
+    since the index may not hold all countries, e.g. before it is
+    generated.
+    """
+    global country_index
+    if country_index is None:
+        country_index = read_countries()
+        if not country_index and os.path.exists(constants.P_REST_COUNTRIES):
+            country_index = import_rest_countries()
+            write_index(countries=country_index)
+    if country_codes and not set(country_codes) <= country_index.keys():
+        print(f'- Obtaining missing countries.')
+        country_index = update_index(country_codes=country_codes,
+                                     countries=country_index)
+    return country_index
+
+
+if __name__ == '__main__':
+    # Build or complete the country index shipped with the project.
+    update_index(countries=read_index(index_path=constants.P_COUNTRY_INDEX),
+                 index_path=constants.P_COUNTRY_INDEX)
@@ -0,0 +1,203 @@
+# Format read from https://peps.python.org/pep-0008/#imports.
+# Standard library imports.
+import os
+
+# Related third party imports.
+
+# Local application/library specific imports.
+import src.collection_builder as collection_builder
+import src.constants as constants
+import src.journal as journal
+import src.tools as tools
+
+
+# Archive of the CTE-HR dataset and its journal, as used by
+# cte_hr_dataset.CteHrDataset(reason='cte_hr').
+ARCHIVES_DIR = 'input-files/cte-hr/in-out-archives'
+P_ARCHIVE = os.path.join(ARCHIVES_DIR, 'cte_hr.json')
+P_ARCHIVE_JOURNAL = os.path.join(ARCHIVES_DIR, 'cte_hr.journal.jsonl')
+# Monthly and yearly CTE-HR collections share their description.
+TITLE = 'High-resolution, near-real-time fluxes over Europe from CTE-HR'
+DESCRIPTION = (
+    '{period} collection of hourly CO2 fluxes for {date}, containing '
+    'hourly estimates of biospheric fluxes, anthropogenic emissions '
+    '(total and per sector), GFAS fire emissions and Jena CarboScope '
+    'ocean fluxes, all re-gridded to match the resolution of the '
+    'biospheric fluxes.\n\nNet ecosystem productivity (gross primary '
+    'production minus respiration). Positive fluxes are emissions, '
+    'negative mean uptake. These fluxes are the result of the SiB4 '
+    '(Version 4.2-COS, hash 1e29b25, '
+    'https://doi.org/10.1029/2018MS001540) biosphere model, driven '
+    'by ERA5 reanalysis data at a 0.5x0.5 degree resolution. The NEP '
+    'per plant functional type are distributed according to the high '
+    'resolution CORINE land-use map '
+    '(https://land.copernicus.eu/pan-european/corine-land-cover), '
+    'and aggregated to CTE-HR resolution.\n\nAnthropogenic emissions '
+    'include contributions from public power, industry, households, '
+    'ground transport, aviation, shipping, and calcination of '
+    'cement. Our product does not include carbonation of cement and '
+    'human respiration. Public power is based on ENTSO-E data '
+    '(https://transparency.entsoe.eu/), Industry, Ground transport, '
+    'Aviation, and Shipping is based on Eurostat data '
+    '(https://ec.europa.eu/eurostat/databrowser/). Household '
+    'emissions are based on a degree-day model, driven by ERA5 '
+    'reanalysis data. Spatial distributions of the emissions are '
+    'based on CAMS data (https://doi.org/10.5194/essd-14-491-2022). '
+    'Cement emissions are taken from GridFED V.2021.3 '
+    '(https://zenodo.org/record/5956612#.YoTmvZNBy9F).\n\nGFAS fire '
+    'emissions (https://doi.org/10.5194/acp-18-5359-2018), '
+    're-gridded to match the resolution of the biosphere, fossil '
+    'fuel, and ocean fluxes of the CTE-HR product. Please always '
+    'cite the original GFAS data when using this file, and use the '
+    'original data when only fire emissions are required. For more '
+    'information, see https://doi.org/10.5281/zenodo.6477331 '
+    'Contains modified Copernicus Atmosphere Monitoring Service '
+    'Information [2020].\n\nOcean fluxes, based on a climatology of '
+    'Jena CarboScope fluxes '
+    '(https://doi.org/10.17871/CarboScope-oc_v2020, '
+    'https://doi.org/10.5194/os-9-193-2013). An adjustment, based on '
+    'windspeed and temperature, is applied to obtain hourly fluxes '
+    'at the CTE-HR resolution. Positive fluxes are emissions and '
+    'negative fluxes indicate uptake. Please always cite the '
+    'original Jena CarboScope data when using this file, and use the '
+    'original data when only low resolution ocean fluxes are '
+    'required.\n\nFor more information, see '
+    'https://doi.org/10.5281/zenodo.6477331'
+)
+# The full collection behind https://doi.org/10.18160/20Z1-AYJ2.
+# Its title and description are kept from its latest version.
+FULL_KEY = 'full'
+# Collection left out of the CTE-HR collections found on the portal.
+EXCLUDED_COLLECTION = \
+    'https://meta.icos-cp.eu/collections/3Oqzho4DBNlfuFYrRrIpZmHR'
+
+
+def monthly_key(base_key: str = None) -> str:
+    """Return the month (e.g. 202301) of a component's archive entry."""
+    return base_key.rsplit('.', maxsplit=1)[-1]
+
+
+def yearly_key(monthly_key: str = None) -> str:
+    """Return the year of a monthly collection."""
+    return monthly_key[0:4]
+
+
+def full_key(yearly_key: str = None) -> str:
+    """All yearly collections go in the full collection."""
+    return FULL_KEY
+
+
+def render_monthly(key: str = None, members: list = None,
+                   previous: dict = None) -> dict:
+    """Monthly collections contain one file per component."""
+    date = f'{key[0:4]}-{key[4:6]}'
+    return dict({
+        'description': DESCRIPTION.format(period='Monthly', date=date),
+        'members': members,
+        'title': f'{TITLE} for {date}'
+    })
+
+
+def render_yearly(key: str = None, members: list = None,
+                  previous: dict = None) -> dict:
+    """Yearly collections contain the monthly collections of a year."""
+    return dict({
+        'description': DESCRIPTION.format(period='Yearly', date=key),
+        'members': members,
+        'title': f'{TITLE} for {key}'
+    })
+
+
+def render_full(key: str = None, members: list = None,
+                previous: dict = None) -> dict:
+    """The full collection contains all yearly collections."""
+    if previous is None:
+        return None
+    return dict({
+        'description': previous['description'],
+        'members': members,
+        'title': previous['title']
+    })
+
+
+LEVELS = [
+    dict({'name': 'monthly', 'group': monthly_key, 'render': render_monthly}),
+    dict({'name': 'yearly', 'group': yearly_key, 'render': render_yearly}),
+    dict({'name': 'full', 'group': full_key, 'render': render_full})
+]
+
+
+def extract_cte_hr_collections(
+        df_collections: 'pandas.DataFrame' = None) -> dict:
+    """
+    Return the latest CTE-HR collections per level, keyed as in LEVELS.
+
+    They are also written to files, as before.
+    """
+    df_cte_hr = df_collections[df_collections.title.str.contains(TITLE)]
+    # Keys are whatever follows the last 'for ' of the title, without
+    # dashes: 202301 for monthly, 2023 for yearly collections.
+    df_cte_hr = df_cte_hr.assign(
+        key=df_cte_hr.title.str.rsplit('for ', n=1).str[-1].str.replace(
+            '-', '', regex=False))
+    df_cte_hr = df_cte_hr[df_cte_hr.coll != EXCLUDED_COLLECTION]
+    # The first collection found for a key is kept.
+    df_cte_hr = df_cte_hr.drop_duplicates(subset='key', keep='first')
+    key_length = df_cte_hr.key.str.len()
+    monthly, yearly = key_length == 6, key_length == 4
+    d_monthly_collections = dict(
+        zip(df_cte_hr.key[monthly], df_cte_hr.coll[monthly]))
+    d_yearly_collections = dict(
+        zip(df_cte_hr.key[yearly], df_cte_hr.coll[yearly]))
+    d_full_collection = dict(zip(df_cte_hr.key[~(monthly | yearly)],
+                                 df_cte_hr.coll[~(monthly | yearly)]))
+    tools.write_json(path='monthly_collections.json', content=d_monthly_collections)
+    tools.write_json(path='yearly_collections.json', content=d_yearly_collections)
+    tools.write_json(path='full_collection.json', content=d_full_collection)
+    current = dict({'monthly': d_monthly_collections,
+                    'yearly': d_yearly_collections,
+                    'full': dict()})
+    # Without a single full collection there is nothing to version.
+    if len(d_full_collection) == 1:
+        current['full'][FULL_KEY] = list(d_full_collection.values())[0]
+    else:
+        print(f'\tFound {len(d_full_collection)} full CTE-HR collections '
+              f'instead of 1; the full collection is not built.')
+    return current
+
+
+def read_archive() -> dict:
+    """
+    Return the current CTE-HR archive.
+
+    Uploads since the archive was last compacted are only recorded in
+    its journal, so the journal is replayed on top of it.
+    """
+    return journal.read_archive(archive_path=P_ARCHIVE,
+                                journal_path=P_ARCHIVE_JOURNAL)
+
+
+def build_cte_hr_collections(
+        archive: dict = None,
+        state_path: str = constants.P_CTE_HR_COLLECTION_STATE,
+        files_path: str = constants.P_CTE_HR_COLLECTION_FILES) -> list:
+    """
+    Build and upload the CTE-HR collections that changed.
+
+    See collection_builder.build_collections(). The catalogue of
+    collections is refreshed first, so that collections uploaded by
+    hand since the last run are taken into account.
+    """
+    current = extract_cte_hr_collections(
+        df_collections=tools.download_collections(refresh='incremental'))
+    errors = collection_builder.build_collections(
+        archive=archive, levels=LEVELS, current=current,
+        state_path=state_path, files_path=files_path)
+    full_versions = collection_builder.read_state(
+        state_path=state_path).get('full', dict()).get(
+        FULL_KEY, dict()).get('versions', list())
+    if not errors and full_versions:
+        print(f'\tLatest full collection: {full_versions[-1]}\n'
+              f'\tUpdate the Target URL of https://doi.org/10.18160/20Z1-AYJ2 '
+              f'if it changed.')
+    return errors
@@ -11,7 +11,6 @@ import re
 # Related third party imports.
 import humanize
 import requests
-import xarray
 
 # Local application/library specific imports.
 import src.constants as constants
@@ -21,6 +20,9 @@ import src.tools as tools
 
 
 class CteHrDataset(dataset.Dataset):
+    # Header-only reads, bypassing xarray's decoding.
+    header_reader = 'netcdf4'
+
     def __init__(self, reason: str = None, interactive: bool = False):
         super().__init__(reason, interactive)
         return
@@ -28,6 +30,7 @@ class CteHrDataset(dataset.Dataset):
     def archive_files(self):
         """Archive file paths, names, and other information if needed."""
         print('- Archiving system information.')
+        self.prefetch_headers(file_paths=self.input_data)
         total = len(self.input_data)
         for index, file_path in enumerate(self.input_data):
             file_name = file_path.split('/')[-1]
@@ -40,7 +43,9 @@ class CteHrDataset(dataset.Dataset):
             dataset_type, dataset_object_spec = \
                 tools.get_specification(file_name)
             base_key = file_name.rstrip('.nc')
-            self.archive_out[base_key] = dict({
+            # Fields recorded by earlier runs (meta-data, upload urls,
+            # versions) are kept.
+            self.archive_out.setdefault(base_key, dict()).update({
                 'file_path': file_path,
                 'file_name': file_name,
                 'dataset_type': dataset_type,
@@ -61,6 +66,7 @@ class CteHrDataset(dataset.Dataset):
                       'upload_data': True})
             )
             self.archive_out[base_key].setdefault('versions', [])
+            self.journal_entries(base_keys=[base_key])
             tools.progress_bar(
                 operation='archive_system_info',
                 current=index + 1, total=total,
@@ -68,14 +74,12 @@ class CteHrDataset(dataset.Dataset):
             )
         # Sort archive's items.
         self.archive_out = dict(sorted(self.archive_out.items()))
-        self.store_current_archive()
         return
 
     def build_try_ingest_components(self, file_path: str = None,
                                     dataset_object_spec: str = None) -> dict:
         """Build the try-ingest command for each data file."""
-        xarray_dataset = xarray.open_dataset(file_path)
-        variable_list = list(xarray_dataset.data_vars)
+        variable_list = self.get_header(file_path=file_path)['data_vars']
         # The variable list must be formatted like this:
         # '["variable_1", "variable_2", ...]'
         # Formatting like this e.g: "['variable_1', 'variable_2', ...]"
@@ -91,7 +95,6 @@ class CteHrDataset(dataset.Dataset):
                                  'file_path': file_path}
         return try_ingest_components
 
-    # todo: Maybe multi-process this.
     def archive_json(self):
         """Generates standalone .json files and adds to archive.
 
@@ -104,6 +107,11 @@ class CteHrDataset(dataset.Dataset):
 
         """
         print('- Archiving meta-data (Includes hash-sum calculation.)')
+        self.prefetch_headers(file_paths=[
+            base_info['file_path'] for base_info in self.archive_out.values()
+            if base_info['handlers']['archive_json']
+        ])
+        hash_sums = self.calculate_hash_sums()
         total = len(self.archive_out)
         for index, (base_key, base_info) in \
                 enumerate(self.archive_out.items()):
@@ -113,72 +121,75 @@ class CteHrDataset(dataset.Dataset):
                                additional_info=dict({
                                    'file_name': base_info['file_name']
                                }))
-            if not base_info['handlers']['upload_metadata']:
+            if not base_info['handlers']['archive_json']:
                 continue
-            xarray_dataset = xarray.open_dataset(base_info['file_path'])
-            creation_date = datetime.strptime(xarray_dataset.creation_date,
-                                              '%Y-%m-%d %H:%M')
-            base_info['json'] = dict({
-                'fileName': base_info['file_name'],
-                'hashSum':
-                    tools.get_hash_sum(file_path=base_info['file_path'],
-                                       progress=False),
-                'isNextVersionOf': [] if not base_info['versions'] else
-                base_info['versions'][-1].rsplit('/')[-1],
-                'objectSpecification': base_info['dataset_object_spec'],
-                'references': {
-                    'keywords': ['carbon flux'],
-                    'licence': constants.ICOS_LICENSE
-                },
-                'specificInfo': {
-                    'description': xarray_dataset.comment,
-                    'production': {
-                        'contributors': [
-                            constants.INGRID_LUIJKX,
-                            constants.NAOMI_SMITH,
-                            constants.REMCO_DE_KOK,
-                            constants.WOUTER_PETERS
-                        ],
-                        'creationDate':
-                            creation_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                        'creator': constants.AUKE_WOUDE,
-                        'hostOrganization': constants.WUR,
-                        # Comment used for correct versions of
-                        # anthropogenic & anthropogenic per sector
-                        # files.
-                        # 'comment': 'In the previous version, the file did not contain the correct Public Power and '
-                        #            'Residential Heating from the degree-day model (see Van der Woude et al. '
-                        #            'https://doi.org/10.5194/essd-2022-175), but rather contained the CAMS diurnal '
-                        #            'profiles.',
-                        'sources': [],
-                    },
-                    'spatial': constants.CTE_HR_BOX,
-                    'temporal': {
-                        'interval': {
-                            'start': xarray_dataset.time[0].dt.strftime(
-                                '%Y-%m-%dT%H:%M:%SZ').item(),
-                            'stop': xarray_dataset.time[-1].dt.strftime(
-                                '%Y-%m-%dT%H:%M:%SZ').item(),
-                        },
-                        'resolution': 'hourly'
-                    },
-                    'title': (
-                        f'High-resolution, near-real-time fluxes over Europe '
-                        f'from CTE-HR: {base_info["dataset_type"]} '
-                        f'{base_info["year"]}-{base_info["month"]}'
-                    ),
-                    'variables':
-                        [variable for variable in xarray_dataset.data_vars],
-                },
-                'submitterId': 'CP'
-            })
+            base_info['json'] = self.render_json(
+                base_info=base_info,
+                hash_sum=hash_sums[base_info['file_path']])
             json_file_name = f'{base_key}.json'
             json_file_path = os.path.join(self.json_standalone_files,
                                           json_file_name)
             base_info['json_file_path'] = json_file_path
             tools.write_json(path=json_file_path, content=base_info['json'])
+            self.journal_entries(base_keys=[base_key])
         # Sort archive's items.
         self.archive_out = dict(sorted(self.archive_out.items()))
-        self.store_current_archive()
         return
 
+    def render_json(self, base_info: dict = None,
+                    hash_sum: str = None) -> dict:
+        """Return the meta-data of an archive entry."""
+        header = self.get_header(file_path=base_info['file_path'])
+        creation_date = datetime.strptime(
+            header['attributes']['creation_date'], '%Y-%m-%d %H:%M')
+        previous_version = self.get_previous_version(base_info=base_info,
+                                                     hash_sum=hash_sum)
+        return dict({
+            'fileName': base_info['file_name'],
+            'hashSum': hash_sum,
+            'isNextVersionOf': [] if previous_version is None else
+            previous_version.rsplit('/')[-1],
+            'objectSpecification': base_info['dataset_object_spec'],
+            'references': {
+                'keywords': ['carbon flux'],
+                'licence': constants.ICOS_LICENSE
+            },
+            'specificInfo': {
+                'description': header['attributes']['comment'],
+                'production': {
+                    'contributors': [
+                        constants.INGRID_LUIJKX,
+                        constants.NAOMI_SMITH,
+                        constants.REMCO_DE_KOK,
+                        constants.WOUTER_PETERS
+                    ],
+                    'creationDate':
+                        creation_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'creator': constants.AUKE_WOUDE,
+                    'hostOrganization': constants.WUR,
+                    # Comment used for correct versions of
+                    # anthropogenic & anthropogenic per sector
+                    # files.
+                    # 'comment': 'In the previous version, the file did not contain the correct Public Power and '
+                    #            'Residential Heating from the degree-day model (see Van der Woude et al. '
+                    #            'https://doi.org/10.5194/essd-2022-175), but rather contained the CAMS diurnal '
+                    #            'profiles.',
+                    'sources': [],
+                },
+                'spatial': constants.CTE_HR_BOX,
+                'temporal': {
+                    'interval': {
+                        'start': header['time_start'],
+                        'stop': header['time_stop'],
+                    },
+                    'resolution': 'hourly'
+                },
+                'title': (
+                    f'High-resolution, near-real-time fluxes over Europe '
+                    f'from CTE-HR: {base_info["dataset_type"]} '
+                    f'{base_info["year"]}-{base_info["month"]}'
+                ),
+                'variables': header['data_vars'],
+            },
+            'submitterId': 'CP'
+        })
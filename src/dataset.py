@@ -1,5 +1,6 @@
 # Format read from https://peps.python.org/pep-0008/#imports.
 # Standard library imports.
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from multiprocessing import Pool
 from pathlib import Path
 from pprint import pprint
@@ -7,6 +8,8 @@ from typing import Generator
 import hashlib
 import json
 import os
+import threading
+import time
 
 # Related third party imports.
 import humanize
@@ -18,10 +21,15 @@ import requests
 # import lpj_guess_dataset
 import src.constants as constants
 import src.exiter as exiter
+import src.headers as headers
+import src.journal as journal
+import src.planner as planner
 import src.tools as tools
 
 
 class Dataset:
+    # Reader of netcdf headers, see headers.HEADER_READERS.
+    header_reader = 'xarray'
 
     def __init__(self, reason: str = None, interactive: bool = False):
         if reason is None:
@@ -36,6 +44,39 @@ class Dataset:
         self.archive_in = os.path.join(self.archives_dir, f'{self.reason}.json')
         self.json_standalone_files = os.path.join(self.master_dir,
                                                   f'json-standalone-files')
+        # Hash-sums of data files are cached here and reused across
+        # runs as long as the files are not modified. Set
+        # `recompute_hash_sums` to ignore the cache and hash again.
+        self.p_hash_cache = os.path.join(self.master_dir, 'hash_sums.sqlite')
+        self.recompute_hash_sums = False
+        # Headers of netcdf files are cached here, so that each file is
+        # opened once across all stages and reruns.
+        self.p_header_cache = os.path.join(self.master_dir,
+                                           'netcdf_headers.sqlite')
+        self.header_memo = dict()
+        # Number of processes used to read netcdf headers. Defaults to
+        # the number of available cores.
+        self.metadata_processes = None
+        # Number of processes used to calculate hash-sums. Defaults to
+        # the number of available cores.
+        self.hash_processes = None
+        # Meta-data uploads in flight and uploads started per second.
+        self.metadata_upload_workers = constants.META_DATA_UPLOAD_WORKERS
+        self.metadata_upload_rate = constants.META_DATA_UPLOAD_RATE
+        # Data uploads in flight and the order they are scheduled in
+        # (largest_first, smallest_first or archive).
+        self.data_upload_workers = constants.DATA_UPLOAD_WORKERS
+        self.data_upload_order = constants.DATA_UPLOAD_ORDER
+        # Size of the blocks data files are sent in.
+        self.data_upload_block_size = constants.UPLOAD_BLOCK_SIZE
+        # Updates of single archive entries are appended to this
+        # journal and replayed on top of `archive_in` when it is read.
+        # The journal is folded back into `archive_in` by
+        # store_current_archive() or once it grows too long.
+        self.archive_journal = os.path.join(
+            self.archives_dir, f'{self.reason}.journal.jsonl')
+        self.journal_records = 0
+        self.journal_lock = threading.Lock()
         Path(self.master_dir).mkdir(parents=True, exist_ok=True)
         Path(self.archives_dir).mkdir(parents=True, exist_ok=True)
         Path(self.json_standalone_files).mkdir(parents=True, exist_ok=True)
@@ -134,6 +175,14 @@ class Dataset:
                           f'{self.archive_in} {constants.ICON_CHECK}')
                     with open(file=self.archive_in, mode='r') as archive_in_handle:
                         archive_out = json.load(archive_in_handle)
+                # Apply updates recorded since the archive was last
+                # stored.
+                self.journal_records = journal.replay(
+                    journal_path=self.archive_journal, archive=archive_out)
+                if self.journal_records:
+                    print(f'- Replayed {self.journal_records} journal '
+                          f'entries from {self.archive_journal} '
+                          f'{constants.ICON_CHECK}')
                 break
             # todo: Implement the user interaction of reading static files.
             #  Until then return an "error" message.
@@ -142,36 +191,84 @@ class Dataset:
                 break
         return archive_out
 
-    def fill_handlers(self):
+    def plan_stages(self):
+        """
+        Decide per archive entry which stages need to run.
+
+        Each data file is hashed (served from the hash-sum cache unless
+        the file changed) and its meta-data are rendered again. Both
+        are compared with what previous runs recorded in the archive,
+        see planner.plan_entry(), and the outcome is written to the
+        entry's `handlers`. Entries whose files are not part of this
+        run go through no stage. For remote sensing datasets the data
+        files are the zip archives in `processed_input_data`. Entries
+        whose handlers changed are journaled.
+        """
+        print('- Planning stages.')
+        input_files = set(self.input_data or []) | \
+            set(self.processed_input_data or [])
+        base_keys = set(
+            base_key for base_key, base_info in self.archive_out.items()
+            if base_info.get('file_path') in input_files and
+            os.path.exists(base_info['file_path'])
+        )
+        file_paths = [
+            self.archive_out[base_key]['file_path'] for base_key in base_keys
+        ]
+        self.prefetch_headers(file_paths=[
+            file_path for file_path in file_paths
+            if file_path.endswith('.nc')
+        ])
+        hash_sums = self.calculate_hash_sums(file_paths=file_paths)
+        replanned_keys = list()
         for base_key, base_info in self.archive_out.items():
-            # Initialize handlers for your static read files.
-            # Zbunchpload will use and update json parts in archive_in
-            # only if their respective handlers are true. For remote
-            # sensing datasets, the actual input files are the zip
-            # archives and not the .nc files themselves. That's why we
-            # use the self.processed_input_data instance variable
-            # instead oof self.input_data.
-            if (
-                    (base_info['file_path'] in self.input_data)
-                    or
-                    (
-                        (self.reason == 'modis' or self.reason == 'landsat')
-                        and
-                        (base_info['file_path'] in self.processed_input_data)
-                    )
-            ):
-                base_info.setdefault('handlers', dict())
-                base_info.update(handlers=dict({'archive_json': True,
-                                                'try_ingest': True,
-                                                'upload_metadata': True,
-                                                'upload_data': True}))
+            handlers = base_info.get('handlers')
+            if base_key not in base_keys:
+                base_info['handlers'] = dict.fromkeys(planner.STAGES, False)
             else:
-                base_info.setdefault('handlers', dict())
-                base_info.update(handlers=dict({'archive_json': False,
-                                                'try_ingest': False,
-                                                'upload_metadata': False,
-                                                'upload_data': False}))
+                hash_sum = hash_sums[base_info['file_path']]
+                base_info['handlers'] = planner.plan_entry(
+                    base_info=base_info,
+                    hash_sum=hash_sum,
+                    rendered_json=self.render_json(base_info=base_info,
+                                                   hash_sum=hash_sum),
+                    upload_confirmed=self.is_upload_confirmed(base_info)
+                )
+            if base_info['handlers'] != handlers:
+                replanned_keys.append(base_key)
+        self.journal_entries(base_keys=replanned_keys)
+        planner.print_plan(archive=self.archive_out)
         return
+
+    @staticmethod
+    def get_previous_version(base_info: dict = None,
+                             hash_sum: str = None) -> str:
+        """
+        Return the landing page new meta-data of an entry replace.
+
+        That is the last of its `versions`, or its current landing page
+        if the file changed since its meta-data were archived; the
+        current page only joins `versions` once upload_metadata()
+        replaces it. Returns None for entries never uploaded.
+        """
+        versions = list(base_info.get('versions', list()))
+        recorded_json = base_info.get('json') or dict()
+        if 'file_metadata_url' in base_info.keys() and \
+                recorded_json.get('hashSum') != hash_sum and \
+                base_info['file_metadata_url'] not in versions:
+            versions.append(base_info['file_metadata_url'])
+        return versions[-1] if versions else None
+
+    def render_json(self, base_info: dict = None,
+                    hash_sum: str = None) -> dict:
+        """
+        Return the meta-data of an archive entry without storing them.
+
+        Datasets that cannot render meta-data outside archive_json()
+        return None.
+        """
+        return None
+
     #
     # def archive_files(self):
     #     return
@@ -179,9 +276,45 @@ class Dataset:
     # def archive_json(self):
     #     return
 
+    def calculate_hash_sums(self, file_paths: list = None) -> dict:
+        """
+        Calculate hash-sums of data files in parallel.
+
+        By default all data files whose meta-data are going to be
+        archived are hashed. Returns a dictionary of file paths to
+        hash-sums.
+        """
+        if file_paths is None:
+            file_paths = [
+                base_info['file_path']
+                for base_info in self.archive_out.values()
+                if base_info['handlers']['archive_json']
+            ]
+        hash_sums = dict()
+        total = len(set(file_paths))
+        for index, (file_path, hash_sum) in enumerate(tools.get_hash_sums(
+                file_paths=file_paths,
+                processes=self.hash_processes,
+                cache_path=self.p_hash_cache,
+                recompute=self.recompute_hash_sums)):
+            hash_sums[file_path] = hash_sum
+            tools.progress_bar(operation='calculate_hash_sums',
+                               current=index + 1,
+                               total=total,
+                               additional_info=dict({
+                                   'source_file': file_path.split('/')[-1]
+                               }))
+        return hash_sums
+
     # todo: Do I need to keep this as a class method?
     # todo: Do I need to add a mode flag for this?
     def store_current_archive(self):
+        """
+        Export the current archive to `archive_in` and empty the journal.
+
+        If the user declines, updates stay in the journal and are
+        replayed in the next run.
+        """
         user_input = 'n'
         if (
                 os.path.exists(self.archive_in)
@@ -190,14 +323,88 @@ class Dataset:
                                     additional_info=dict(
                                         {'archive': self.archive_in})) == 'Y'
         ):
-            with open(file=self.archive_in, mode='w') as archive_out_handle:
-                json.dump(self.archive_out, archive_out_handle, indent=4)
+            self.compact_journal()
+        elif self.journal_records:
+            print(f'\tArchive updates are kept in {self.archive_journal}.')
+        return
+
+    def journal_entries(self, base_keys: list = None):
+        """
+        Record the current content of archive entries in the journal.
+
+        Records all entries if `base_keys` is not given. This is cheap
+        enough to be called after each processed object. Once the
+        journal holds more than JOURNAL_COMPACTION_RECORDS entries it
+        is folded into `archive_in`.
+        """
+        with self.journal_lock:
+            self.append_journal(base_keys=base_keys)
+        return
+
+    def append_journal(self, base_keys: list = None):
+        """
+        Same as journal_entries() for callers holding `journal_lock`.
+
+        Entries changed from several threads must be changed and
+        journaled while holding the lock, so that they are never
+        serialised half-updated.
+        """
+        if base_keys is None:
+            base_keys = list(self.archive_out.keys())
+        self.journal_records += journal.append_entries(
+            journal_path=self.archive_journal,
+            entries=dict({
+                base_key: self.archive_out[base_key]
+                for base_key in base_keys
+            }))
+        if self.journal_records > constants.JOURNAL_COMPACTION_RECORDS:
+            journal.compact(journal_path=self.archive_journal,
+                            archive_path=self.archive_in,
+                            archive=self.archive_out)
+            self.journal_records = 0
+        return
+
+    def compact_journal(self):
+        """Fold the journal into `archive_in`."""
+        with self.journal_lock:
+            journal.compact(journal_path=self.archive_journal,
+                            archive_path=self.archive_in,
+                            archive=self.archive_out)
+            self.journal_records = 0
+        return
+
+    def get_header(self, file_path: str = None) -> dict:
+        """Return the cached header of a netcdf data file."""
+        if file_path not in self.header_memo.keys():
+            self.header_memo[file_path] = headers.get_header(
+                file_path=file_path,
+                cache_path=self.p_header_cache,
+                reader=self.header_reader)
+        return self.header_memo[file_path]
+
+    def prefetch_headers(self, file_paths: list = None):
+        """
+        Read headers of many netcdf files at once across processes.
+
+        Later calls of get_header() for these files are served from
+        memory, so the stages themselves stay serial and produce the
+        same archive as a serial run.
+        """
+        if not file_paths:
+            return
+        print(f'\tReading headers of {len(file_paths)} file(s)... ',
+              end='', flush=True)
+        self.header_memo.update(headers.get_headers(
+            file_paths=file_paths,
+            cache_path=self.p_header_cache,
+            reader=self.header_reader,
+            processes=self.metadata_processes))
+        print(constants.ICON_CHECK)
         return
 
     def build_try_ingest_components(self, file_path: str = None) -> dict:
         """Build the try-ingest command for each data file."""
-        xarray_dataset = xarray.open_dataset(file_path)
-        variable_list = list(xarray_dataset.data_vars)
+        variable_list = self.get_header(file_path=file_path)['data_vars']
         # The variable list must be formatted like this:
         # '["variable_1", "variable_2", ...]'
         # Formatting like this e.g: "['variable_1', 'variable_2', ...]"
@@ -217,56 +424,98 @@ class Dataset:
         # Get number of try-ingest subprocesses from user input.
         # Setting this to more than 1 sometimes might not work.
         print(f'- Trying ingestion of files (This might take a while.)')
-        subprocesses = int(tools.input_handler(operation='try_ingest'))
-        checks = 0
         command_list = list()
+        base_keys = dict()
         for base_key, base_info in self.archive_out.items():
             if base_info['handlers']['try_ingest']:
                 command_list.append(base_info['try_ingest_components'])
-        # Break up the list into smaller lists of n items per sublist.
-        # This way we can produce user output faster, so that the person
-        # who executes this script has an idea of what's happening.
+                base_keys[base_info['file_path']] = base_key
+        if not command_list:
+            return
+        subprocesses = int(tools.input_handler(operation='try_ingest'))
+        # A single pool is kept busy for the whole run; results are
+        # reported as soon as each file is done, so that a slow file
+        # does not hold back the output and the processing of others.
         # todo: Maybe make this part interactive using the self.interactive class attribute.
-        lists_to_process = [
-            command_list[i * subprocesses:(i + 1) * subprocesses]
-            for i in range(
-                (len(command_list) + subprocesses - 1) // subprocesses
-            )
-        ]
         results = list()
-        total = len(lists_to_process)
-        for item_list in lists_to_process:
-            pool_results = list()
-            # Create a process for each item in the sublist.
-            with Pool(processes=len(item_list)) as pool:
-                # Each item in the sublist is passed as an argument to
-                # `execute_item()` function.
-                pool_results = pool.map(self.execute_item, item_list)
-                for pool_result in pool_results:
-                    if pool_result['status_code'] != 200:
-                        exiter.exit_zupload(exit_type='try_ingest',
-                                            info=pool_result)
-                    else:
-                        checks += 1
-                        tools.progress_bar(operation='try_ingest',
-                                           current=checks,
-                                           total=total,
-                                           additional_info=pool_result)
-                results.extend(pool_results)
+        total = len(command_list)
+        with Pool(processes=min(subprocesses, total)) as pool:
+            for checks, pool_result in enumerate(pool.imap_unordered(
+                    self.hash_and_execute_item,
+                    [(self.execute_item, try_ingest_components,
+                      self.p_hash_cache)
+                     for try_ingest_components in command_list])):
+                if pool_result['status_code'] != 200:
+                    exiter.exit_zupload(exit_type='try_ingest',
+                                        info=pool_result)
+                if pool_result['fingerprint'] is not None:
+                    tools.store_cached_hash_sum(
+                        cache_path=self.p_hash_cache,
+                        file_path=pool_result['file_path'],
+                        fingerprint=pool_result['fingerprint'],
+                        hash_sum=pool_result['hash_sum'])
+                # Record what passed, so that the planner does not
+                # try-ingest the file again until it changes.
+                base_key = base_keys[pool_result['file_path']]
+                self.archive_out[base_key]['try_ingest_hash_sum'] = \
+                    pool_result['hash_sum']
+                self.journal_entries(base_keys=[base_key])
+                tools.progress_bar(operation='try_ingest',
+                                   current=checks + 1,
+                                   total=total,
+                                   additional_info=pool_result)
+                results.append(pool_result)
+        latencies = [result['latency'] for result in results]
+        print(f'\tTry-ingest latency per file: '
+              f'min {min(latencies):.1f}s, '
+              f'mean {sum(latencies) / len(latencies):.1f}s, '
+              f'max {max(latencies):.1f}s.')
         return
 
+    @staticmethod
+    def hash_and_execute_item(arguments: tuple = None) -> dict:
+        """
+        Used from processes spawned by try_ingest().
+
+        Runs `execute_item` on the try-ingest components and adds the
+        file's path and hash-sum to its result. The hash-sum is taken before the
+        file is sent, from the cache unless the file changed. Newly
+        calculated hash-sums come with the file's fingerprint, so that
+        the parent process can cache them; `fingerprint` is None
+        otherwise.
+        """
+        execute_item, try_ingest_components, cache_path = arguments
+        file_path = try_ingest_components['file_path']
+        fingerprint = None
+        hash_sum = tools.read_cached_hash_sum(cache_path=cache_path,
+                                              file_path=file_path)
+        if not hash_sum:
+            _, fingerprint, hash_sum = \
+                tools.calculate_hash_sum(file_path=file_path)
+        result = execute_item(try_ingest_components)
+        # Results are matched to archive entries by their file path.
+        result.update({'file_path': file_path,
+                       'hash_sum': hash_sum,
+                       'fingerprint': fingerprint})
+        return result
+
     @staticmethod
     def execute_item(try_ingest_components: dict = None) -> dict:
         """Used from processes spawned by try_ingest()."""
-        try_ingest_response = requests.put(
-            url=try_ingest_components['url'],
-            data=open(file=try_ingest_components['file_path'], mode='rb'),
-            params=try_ingest_components['params']
-        )
+        start_time = time.monotonic()
+        with tools.MappedFileBody(
+                file_path=try_ingest_components['file_path']) as data:
+            try_ingest_response = tools.get_session().put(
+                url=try_ingest_components['url'],
+                data=data,
+                params=try_ingest_components['params']
+            )
         file_name = try_ingest_components['file_path'].split('/')[-1]
         return {'status_code': try_ingest_response.status_code,
                 'text': try_ingest_response.text,
-                'file_name': file_name}
+                'file_name': file_name,
+                'file_path': try_ingest_components['file_path'],
+                'latency': time.monotonic() - start_time}
 
     def re_ingest(self):
         for base_key, base_info in self.archive_out.items():
@@ -280,43 +529,104 @@ class Dataset:
             print(re_ingest_command)
         return
 
+    @staticmethod
+    def post_metadata(json_file_path: str = None, cookies=None,
+                      rate_limiter: tools.RateLimiter = None) \
+            -> requests.Response:
+        """Used from threads spawned by upload_metadata()."""
+        with open(file=json_file_path, mode='rb') as data:
+            rate_limiter.acquire()
+            return tools.get_session().post(
+                url=constants.META_DATA_UPLOAD_URL,
+                # url=constants.META_STAGING_DATA_UPLOAD_URL,
+                data=data,
+                headers={'Content-Type': 'application/json'},
+                cookies=cookies
+            )
+
     def upload_metadata(self):
+        """
+        Upload meta-data of files concurrently.
+
+        At most `metadata_upload_workers` uploads are in flight and at
+        most `metadata_upload_rate` uploads are started per second.
+        Responses are written into the archive and its journal as they
+        arrive; failed uploads are recorded under
+        `upload_metadata_error`. If any upload failed, zupload exits
+        once all uploads are done.
+        """
         print('- Uploading meta-data.')
-        total = len(self.archive_out)
-        for index, (base_key, base_info) in \
-                enumerate(self.archive_out.items()):
-            if base_info['handlers']['upload_metadata']:
-                data = open(file=base_info['json_file_path'], mode='rb')
-                cookies = tools.load_cookie()
-                headers = {'Content-Type': 'application/json'}
-                upload_metadata_response = requests.post(
-                    url=constants.META_DATA_UPLOAD_URL,
-                    # url=constants.META_STAGING_DATA_UPLOAD_URL,
-                    data=data,
-                    headers=headers,
-                    cookies=cookies
-                )
-                if upload_metadata_response.status_code == 200:
-                    file_data_url = upload_metadata_response.text
-                    base_info['file_data_url'] = file_data_url
-                    base_info['file_metadata_url'] = \
-                        file_data_url.replace('data', 'meta')
+        base_keys = [
+            base_key for base_key, base_info in self.archive_out.items()
+            if base_info['handlers']['upload_metadata']
+        ]
+        total = len(base_keys)
+        cookies = tools.load_cookie()
+        rate_limiter = tools.RateLimiter(rate=self.metadata_upload_rate)
+        errors = list()
+        with ThreadPoolExecutor(
+                max_workers=self.metadata_upload_workers) as executor:
+            futures = {
+                executor.submit(
+                    self.post_metadata,
+                    json_file_path=self.archive_out[base_key][
+                        'json_file_path'],
+                    cookies=cookies,
+                    rate_limiter=rate_limiter
+                ): base_key
+                for base_key in base_keys
+            }
+            for index, future in enumerate(as_completed(futures)):
+                base_info = self.archive_out[futures[future]]
+                try:
+                    upload_metadata_response = future.result()
+                except requests.exceptions.RequestException as e:
+                    status_code, text = None, str(e)
                 else:
-                    exiter.exit_zupload(
-                        exit_type='upload_meta_data',
-                        info=dict({
-                            'status_code':
-                                upload_metadata_response.status_code,
-                            'text': upload_metadata_response.text,
-                            'file_name': base_info['file_name']
-                        }))
-            tools.progress_bar(operation='upload_meta_data',
-                               current=index+1,
-                               total=total,
-                               additional_info=dict({
-                                   'file_name': base_info['file_name']
-                               }))
-        self.store_current_archive()
+                    status_code = upload_metadata_response.status_code
+                    text = upload_metadata_response.text
+                if status_code == 200:
+                    # Data of entries uploaded before upload confirmations
+                    # existed stay uploaded if their data url is the same.
+                    if planner.get_recorded_state(
+                            base_info=base_info)['data_uploaded'] and \
+                            base_info['file_data_url'] == text:
+                        base_info['upload_progress'] = dict({
+                            'state': 'completed',
+                            'file_data_url': text
+                        })
+                    base_info['file_data_url'] = text
+                    # A changed file got a new landing page; the one it
+                    # replaces becomes its previous version.
+                    file_metadata_url = text.replace('data', 'meta')
+                    replaced_url = base_info.get('file_metadata_url')
+                    versions = base_info.setdefault('versions', list())
+                    if replaced_url not in [None, file_metadata_url] and \
+                            versions[-1:] != [replaced_url]:
+                        versions.append(replaced_url)
+                    base_info['file_metadata_url'] = file_metadata_url
+                    base_info['uploaded_json_hash'] = \
+                        planner.json_hash(content=base_info['json'])
+                    base_info.pop('upload_metadata_error', None)
+                else:
+                    base_info['upload_metadata_error'] = dict({
+                        'status_code': status_code,
+                        'text': text
+                    })
+                    errors.append(dict({
+                        'status_code': status_code,
+                        'text': text,
+                        'file_name': base_info['file_name']
+                    }))
+                self.journal_entries(base_keys=[futures[future]])
+                tools.progress_bar(operation='upload_meta_data',
+                                   current=index+1,
+                                   total=total,
+                                   additional_info=dict({
+                                       'file_name': base_info['file_name']
+                                   }))
+        if errors:
+            exiter.exit_zupload(exit_type='upload_meta_data', info=errors[0])
         return
 
     @staticmethod
@@ -334,42 +644,155 @@ class Dataset:
                                    total=total_size)
         return
 
+    def schedule_data_uploads(self) -> list:
+        """
+        Return the archive keys of files to upload, in upload order.
+
+        Files whose upload to their current `file_data_url` has already
+        been confirmed are left out.
+
+        `largest_first` minimises the total upload time since the
+        biggest files do not end up alone at the tail of the run.
+        `smallest_first` produces finished uploads as early as possible.
+        `archive` keeps the order of the archive.
+        """
+        base_keys = [
+            base_key for base_key, base_info in self.archive_out.items()
+            if base_info['handlers']['upload_data'] and
+            'file_data_url' in base_info.keys()
+        ]
+        confirmed_keys = [
+            base_key for base_key in base_keys
+            if self.is_upload_confirmed(self.archive_out[base_key])
+        ]
+        if confirmed_keys:
+            print(f'\tSkipping {len(confirmed_keys)} file(s) already '
+                  f'uploaded {constants.ICON_CHECK}')
+        base_keys = [
+            base_key for base_key in base_keys
+            if base_key not in confirmed_keys
+        ]
+        if self.data_upload_order in ['largest_first', 'smallest_first']:
+            base_keys.sort(
+                key=lambda base_key:
+                    os.path.getsize(self.archive_out[base_key]['file_path']),
+                reverse=self.data_upload_order == 'largest_first'
+            )
+        return base_keys
+
+    def checkpoint_upload(self, base_key: str = None, **progress):
+        """Record upload progress of an archive entry in the journal."""
+        with self.journal_lock:
+            self.archive_out[base_key].setdefault('upload_progress', dict())
+            self.archive_out[base_key]['upload_progress'].update(progress)
+            self.append_journal(base_keys=[base_key])
+        return
+
+    @staticmethod
+    def is_upload_confirmed(base_info: dict = None) -> bool:
+        """Check if data were uploaded to the current `file_data_url`."""
+        upload_progress = base_info.get('upload_progress', dict())
+        return (
+            upload_progress.get('state') == 'completed'
+            and
+            upload_progress.get('file_data_url') ==
+            base_info.get('file_data_url')
+        )
+
+    def put_data(self, base_key: str = None,
+                 cookies=None) -> requests.Response:
+        """Used from threads spawned by upload_data()."""
+        base_info = self.archive_out[base_key]
+        self.checkpoint_upload(base_key=base_key,
+                               state='started',
+                               file_data_url=base_info['file_data_url'],
+                               bytes_sent=0)
+        with tools.MappedFileBody(
+                file_path=base_info['file_path'],
+                block_size=self.data_upload_block_size,
+                callback=lambda bytes_sent: self.checkpoint_upload(
+                    base_key=base_key, bytes_sent=bytes_sent),
+                interval=constants.UPLOAD_CHECKPOINT_INTERVAL) as data:
+            args = {
+                'url': base_info['file_data_url'],
+                'cookies': cookies,
+                'headers': {'Content-Type': 'application/octet-stream'},
+                'data': data
+            }
+            response = tools.handle_request(request='put', args=args)
+        if response.status_code == 200:
+            self.checkpoint_upload(base_key=base_key, state='completed')
+        return response
+
     def upload_data(self):
+        """
+        Upload data files concurrently.
+
+        At most `data_upload_workers` files are uploaded at once, in the
+        order given by `data_upload_order`. Progress of each upload is
+        checkpointed under `upload_progress`, so a rerun after a crash
+        only sends files whose upload was not confirmed. Failed uploads
+        are recorded under `upload_data_error` and zupload exits once
+        all uploads are done.
+        """
         print('- Uploading data.')
-        total = len(self.archive_out)
-        for index, (base_key, base_info) in \
-                enumerate(self.archive_out.items()):
-            if base_info['handlers']['upload_data'] and \
-                    'file_data_url' in base_info.keys():
-                args = {
-                    'url': base_info['file_data_url'],
-                    'cookies': tools.load_cookie(),
-                    'headers': {'Content-Type': 'application/octet-stream'},
-                    'data': open(file=base_info['file_path'], mode='rb')
-                }
-                response = tools.handle_request(request='put', args=args)
-                if response.status_code != 200:
-                    exiter.exit_zupload(
-                        exit_type='upload_data',
-                        info=dict({
-                            'status_code': response.status_code,
-                            'text': response.text,
+        base_keys = self.schedule_data_uploads()
+        total = len(base_keys)
+        cookies = tools.load_cookie()
+        errors = list()
+        uploaded_bytes = 0
+        start_time = time.monotonic()
+        with ThreadPoolExecutor(
+                max_workers=self.data_upload_workers) as executor:
+            futures = {
+                executor.submit(
+                    self.put_data,
+                    base_key=base_key,
+                    cookies=cookies
+                ): base_key
+                for base_key in base_keys
+            }
+            for index, future in enumerate(as_completed(futures)):
+                base_info = self.archive_out[futures[future]]
+                try:
+                    response = future.result()
+                except requests.exceptions.RequestException as e:
+                    response = None
+                    status_code, text = None, str(e)
+                else:
+                    status_code, text = response.status_code, response.text
+                # Other uploads are still checkpointed from their threads.
+                with self.journal_lock:
+                    if status_code == 200:
+                        uploaded_bytes += \
+                            os.path.getsize(base_info['file_path'])
+                        base_info.pop('upload_data_error', None)
+                    else:
+                        base_info['upload_data_error'] = dict({
+                            'status_code': status_code,
+                            'text': text
+                        })
+                        errors.append(dict({
+                            'status_code': status_code,
+                            'text': text,
                             'file_name': base_info['file_name']
                         }))
-                # response = requests.put(
-                #     url=base_info['file_data_url'],
-                #     cookies=tools.load_cookie(),
-                #     headers={'Content-Type': 'application/octet-stream'},
-                #     data=open(file=base_info['file_path'], mode='rb')
-                # )
-                tools.progress_bar(operation='upload_data',
-                                   current=index+1,
-                                   total=total,
-                                   additional_info=dict({
-                                       'file_name': base_info['file_name'],
-                                       'response': response
-                                   }))
-        self.store_current_archive()
+                    self.append_journal(base_keys=[futures[future]])
+                if response is not None:
+                    tools.progress_bar(operation='upload_data',
+                                       current=index+1,
+                                       total=total,
+                                       additional_info=dict({
+                                           'file_name': base_info['file_name'],
+                                           'response': response
+                                       }))
+        elapsed = time.monotonic() - start_time
+        if total:
+            print(f'\tUploaded {humanize.naturalsize(uploaded_bytes)} in '
+                  f'{elapsed:.1f}s '
+                  f'({humanize.naturalsize(uploaded_bytes / elapsed)}/s).')
+        if errors:
+            exiter.exit_zupload(exit_type='upload_data', info=errors[0])
         return
 
     def printer(self):
@@ -401,8 +824,8 @@ class Dataset:
             handlers = {}
         self.archive_files() if handlers['archive_files'] \
             else print(f'- Skipping archiving of files.')
-        # self.fill_handlers() if handlers['fill_handlers'] \
-        #     else print(f'- {constants.ICON_HOLE:3}Skipping handler filling...')
+        self.plan_stages() if handlers['plan_stages'] \
+            else print(f'- Skipping planning of stages.')
         self.try_ingest() if handlers['try_ingest'] \
             else print(f'- Skipping try ingestion of files.')
         self.archive_json() if handlers['archive_json'] \
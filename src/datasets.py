@@ -0,0 +1,41 @@
+# Format read from https://peps.python.org/pep-0008/#imports.
+# Standard library imports.
+import importlib
+
+# Related third party imports.
+
+# Local application/library specific imports.
+
+
+# Dataset class of each reason, given as the module it is defined in
+# and its name. Modules are imported on demand, so a run only imports
+# the dataset it uploads (and its dependencies).
+DATASETS = dict({
+    'cte_hr': ('src.cte_hr_dataset', 'CteHrDataset'),
+    'gcp_inversion': ('src.gcp_inversions_dataset', 'GcpInversionsDataset'),
+    'landsat': ('src.remote_sensing_dataset', 'RemoteSensingDataset'),
+    'lpj_guess_global': ('src.NEEDS_UPDATING_lpj_guess_dataset',
+                         'LpjGuessDataset'),
+    'modis': ('src.remote_sensing_dataset', 'RemoteSensingDataset')
+})
+
+
+def register_dataset(reason: str = None, module: str = None,
+                     class_name: str = None):
+    """Add a dataset class to the registry without importing it."""
+    DATASETS[reason] = (module, class_name)
+    return
+
+
+def get_dataset_class(reason: str = None) -> type:
+    """Import and return the dataset class of a reason."""
+    if reason not in DATASETS.keys():
+        exit(f'Unknown reason: {reason}. '
+             f'Known reasons: {", ".join(sorted(DATASETS.keys()))}.')
+    module, class_name = DATASETS[reason]
+    return getattr(importlib.import_module(module), class_name)
+
+
+def get_dataset(reason: str = None, **kwargs):
+    """Return a dataset of a reason, e.g. get_dataset(reason='modis')."""
+    return get_dataset_class(reason=reason)(reason=reason, **kwargs)
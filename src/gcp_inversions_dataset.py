@@ -11,16 +11,19 @@ import re
 # Related third party imports.
 import humanize
 import requests
-import xarray
 
 # Local application/library specific imports.
 import src.constants as constants
 import src.dataset as dataset
 import src.exiter as exiter
+import src.headers as headers
 import src.tools as tools
 
 
 class GcpInversionsDataset(dataset.Dataset):
+    # Header-only reads, bypassing xarray's decoding.
+    header_reader = 'netcdf4'
+
     def __init__(self, reason: str = None, interactive: bool = False):
         super().__init__(reason, interactive)
         # Todo: Need a proper way to find and exclude variables.
@@ -36,6 +39,7 @@ class GcpInversionsDataset(dataset.Dataset):
     def archive_files(self):
         """Archive file paths, names, and other information if needed."""
         print('- Archiving system information.')
+        self.prefetch_headers(file_paths=self.input_data)
         total = len(self.input_data)
         for index, file_path in enumerate(self.input_data):
             file_name = file_path.split('/')[-1]
@@ -55,7 +59,9 @@ class GcpInversionsDataset(dataset.Dataset):
             dataset_type, dataset_object_spec = \
                 tools.get_specification(file_name)
             base_key = file_name.rstrip('.nc')
-            self.archive_out[base_key] = dict({
+            # Fields recorded by earlier runs (meta-data, upload urls,
+            # versions) are kept.
+            self.archive_out.setdefault(base_key, dict()).update({
                 'file_path': file_path,
                 'file_name': file_name,
                 'dataset_type': dataset_type,
@@ -76,6 +82,7 @@ class GcpInversionsDataset(dataset.Dataset):
                       'upload_data': True})
             )
             self.archive_out[base_key].setdefault('versions', [])
+            self.journal_entries(base_keys=[base_key])
             tools.progress_bar(
                 operation='archive_system_info',
                 current=index + 1, total=total,
@@ -83,19 +90,18 @@ class GcpInversionsDataset(dataset.Dataset):
             )
         # Sort archive's items.
         self.archive_out = dict(sorted(self.archive_out.items()))
-        self.store_current_archive()
         return
 
     def build_try_ingest_components(self, file_path: str = None,
                                     dataset_object_spec: str = None) -> dict:
         """Build the try-ingest command for each data file."""
         try:
-            xarray_dataset = xarray.open_dataset(file_path)
+            header = self.get_header(file_path=file_path)
         except ValueError as e:
             variables = None
         else:
             variable_list = list(
-                variable for variable in xarray_dataset.data_vars
+                variable for variable in header['data_vars']
                 if variable not in self.excluded_variables
             )
             # The variable list must be formatted like this:
@@ -114,7 +120,6 @@ class GcpInversionsDataset(dataset.Dataset):
                                  'file_path': file_path}
         return try_ingest_components
 
-    # todo: Maybe multi-process this.
     def archive_json(self):
         """Generates standalone .json files and adds to archive.
 
@@ -126,6 +131,11 @@ class GcpInversionsDataset(dataset.Dataset):
         `store_current_archive()`.
         """
         print('- Archiving meta-data (Includes hash-sum calculation.)')
+        self.prefetch_headers(file_paths=[
+            base_info['file_path'] for base_info in self.archive_out.values()
+            if base_info['handlers']['archive_json']
+        ])
+        hash_sums = self.calculate_hash_sums()
         total = len(self.archive_out)
         for index, (base_key, base_info) in \
                 enumerate(self.archive_out.items()):
@@ -136,109 +146,94 @@ class GcpInversionsDataset(dataset.Dataset):
                                    additional_info=dict({
                                        'file_name': base_info['file_name']
                                    }))
-            if not base_info['handlers']['upload_metadata']:
+            if not base_info['handlers']['archive_json']:
                 continue
-            xarray_dataset = xarray.open_dataset(base_info['file_path'])
-            if len(xarray_dataset.creation_date) < 16:
-                creation_date = datetime.strptime(
-                    xarray_dataset.creation_date, '%Y-%m-%d')
-            else:
-                creation_date = datetime.strptime(
-                    xarray_dataset.creation_date, '%Y-%m-%d %H:%M')
-            base_info['json'] = dict({
-                'fileName': base_info['file_name'],
-                'hashSum':
-                    tools.get_hash_sum(file_path=base_info['file_path'],
-                                       progress=True),
-                'isNextVersionOf': [] if not base_info['versions'] else
-                base_info['versions'][-1].rsplit('/')[-1],
-                'objectSpecification': base_info['dataset_object_spec'],
-                'references': {
-                    'keywords': [
-                        'carbon flux',
-                        'land carbon flux',
-                        'ocean carbon flux',
-                        'GCB2022',
-                        'global carbon',
-                        'project',
-                        'atmospheric',
-                        'inversions',
-                        'monthly',
-                        'co2'
-                    ],
-                    'licence': constants.ICOS_LICENSE
-                },
-                'specificInfo': {
-                    'description': xarray_dataset.summary,
-                    'production': {
-                        'contributors': [
-                            constants.FREDERIC_CHEVALLIER,
-                            constants.CHRISTIAN_ROEDENBECK,
-                            constants.YOSUKE_NIWA,
-                            constants.JUNJIE_LIU,
-                            constants.LIANG_FENG,
-                            constants.PAUL_PALMER,
-                            constants.KEVIN_BOWMAN,
-                            constants.WOUTER_PETERS,
-                            constants.XIANGJUN_TIAN,
-                            constants.SHILONG_PIAO,
-                            constants.BO_ZHENG
-                        ],
-                        'creationDate':
-                            creation_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                        'creator': constants.INGRID_LUIJKX,
-                        'hostOrganization': constants.WUR,
-                        'sources': [],
-                    },
-                    'spatial': self.get_spatial(dataset=xarray_dataset),
-                    # 'spatial': constants.GLOBAL_BOX,
-                    'temporal': {
-                        'interval': {
-                            # 'start': '1980-01-01T00:00:00Z',
-                            # 'stop': '2020-12-31T23:59:59Z',
-                            'start': xarray_dataset.time[0].dt.strftime(
-                                    '%Y-%m-%dT%H:%M:%SZ').item(),
-                            'stop': xarray_dataset.time[-1].dt.strftime(
-                                '%Y-%m-%dT%H:%M:%SZ').item(),
-                        },
-                        'resolution': 'monthly'
-                    },
-                    'title': xarray_dataset.title,
-                    # 'title': 'GAW Data',
-                    'variables': list(
-                        variable for variable in xarray_dataset.data_vars
-                        if variable not in self.excluded_variables
-                    ),
-                },
-                'submitterId': constants.STANDARD_SUBMITTER
-            })
+            base_info['json'] = self.render_json(
+                base_info=base_info,
+                hash_sum=hash_sums[base_info['file_path']])
             json_file_name = base_key + '.json'
             json_file_path = os.path.join(self.json_standalone_files,
                                           json_file_name)
             base_info['json_file_path'] = json_file_path
             tools.write_json(path=json_file_path, content=base_info['json'])
+            self.journal_entries(base_keys=[base_key])
         # Sort archive's items.
         self.archive_out = dict(sorted(self.archive_out.items()))
-        self.store_current_archive()
         return
 
-
-    @staticmethod
-    def get_spatial(dataset: xarray = None) -> dict:
-        spatial = dict({
-            '_type': 'LatLonBox',
-            'min': {'lat': None, 'lon': None},
-            'max': {'lat': None, 'lon': None}
+    def render_json(self, base_info: dict = None,
+                    hash_sum: str = None) -> dict:
+        """Return the meta-data of an archive entry."""
+        header = self.get_header(file_path=base_info['file_path'])
+        attributes = header['attributes']
+        if len(attributes['creation_date']) < 16:
+            creation_date = datetime.strptime(
+                attributes['creation_date'], '%Y-%m-%d')
+        else:
+            creation_date = datetime.strptime(
+                attributes['creation_date'], '%Y-%m-%d %H:%M')
+        previous_version = self.get_previous_version(base_info=base_info,
+                                                     hash_sum=hash_sum)
+        return dict({
+            'fileName': base_info['file_name'],
+            'hashSum': hash_sum,
+            'isNextVersionOf': [] if previous_version is None else
+            previous_version.rsplit('/')[-1],
+            'objectSpecification': base_info['dataset_object_spec'],
+            'references': {
+                'keywords': [
+                    'carbon flux',
+                    'land carbon flux',
+                    'ocean carbon flux',
+                    'GCB2022',
+                    'global carbon',
+                    'project',
+                    'atmospheric',
+                    'inversions',
+                    'monthly',
+                    'co2'
+                ],
+                'licence': constants.ICOS_LICENSE
+            },
+            'specificInfo': {
+                'description': attributes['summary'],
+                'production': {
+                    'contributors': [
+                        constants.FREDERIC_CHEVALLIER,
+                        constants.CHRISTIAN_ROEDENBECK,
+                        constants.YOSUKE_NIWA,
+                        constants.JUNJIE_LIU,
+                        constants.LIANG_FENG,
+                        constants.PAUL_PALMER,
+                        constants.KEVIN_BOWMAN,
+                        constants.WOUTER_PETERS,
+                        constants.XIANGJUN_TIAN,
+                        constants.SHILONG_PIAO,
+                        constants.BO_ZHENG
+                    ],
+                    'creationDate':
+                        creation_date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'creator': constants.INGRID_LUIJKX,
+                    'hostOrganization': constants.WUR,
+                    'sources': [],
+                },
+                'spatial': header['spatial'],
+                # 'spatial': constants.GLOBAL_BOX,
+                'temporal': {
+                    'interval': {
+                        # 'start': '1980-01-01T00:00:00Z',
+                        # 'stop': '2020-12-31T23:59:59Z',
+                        'start': header['time_start'],
+                        'stop': header['time_stop'],
+                    },
+                    'resolution': 'monthly'
+                },
+                'title': attributes['title'],
+                # 'title': 'GAW Data',
+                'variables': list(
+                    variable for variable in header['data_vars']
+                    if variable not in self.excluded_variables
+                ),
+            },
+            'submitterId': constants.STANDARD_SUBMITTER
         })
-        if all(key in dataset for key in ['lat', 'lon']):
-            spatial['min']['lat'] = dataset.lat.min().item()
-            spatial['min']['lon'] = dataset.lon.min().item()
-            spatial['max']['lat'] = dataset.lat.max().item()
-            spatial['max']['lon'] = dataset.lon.max().item()
-        elif all(key in dataset for key in ['latitude', 'longitude']):
-            spatial['min']['lat'] = dataset.latitude.min().item()
-            spatial['min']['lon'] = dataset.longitude.min().item()
-            spatial['max']['lat'] = dataset.latitude.max().item()
-            spatial['max']['lon'] = dataset.longitude.max().item()
-        return spatial
-
@@ -0,0 +1,304 @@
+# Format read from https://peps.python.org/pep-0008/#imports.
+# Standard library imports.
+from multiprocessing import Pool
+import json
+import os
+import sqlite3
+
+# Related third party imports.
+# netCDF4, numpy and xarray take most of zupload's start-up time, so
+# they are imported by the functions that read files. Runs whose
+# headers are all cached never import them.
+
+# Local application/library specific imports.
+import src.tools as tools
+
+
+# Bump this whenever the content of a header changes, so that headers
+# cached by older versions are read again.
+HEADER_VERSION = 1
+# Global attributes used in meta-data.
+HEADER_ATTRIBUTES = ['creation_date', 'comment', 'summary', 'title']
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+# Maximum number of coordinate values held in memory while computing
+# the extent of a multidimensional coordinate.
+EXTENT_CHUNK_SIZE = 2**22
+
+
+def read_values(variable=None, key: slice = None) -> 'numpy.ndarray':
+    """Read part of an xarray or netCDF4 variable along its first axis."""
+    import netCDF4
+    import numpy
+    if not isinstance(variable, netCDF4.Variable):
+        return variable[key].values
+    # netCDF4 returns masked arrays, with fill values masked out.
+    values = variable[key]
+    if numpy.ma.isMaskedArray(values):
+        values = values.compressed()
+    return numpy.asarray(values)
+
+
+def reduce_extent(values: 'numpy.ndarray' = None) -> tuple:
+    """Return minimum and maximum of an array, skipping NaN values."""
+    import numpy
+    if values.size == 0:
+        return None, None
+    if numpy.issubdtype(values.dtype, numpy.floating):
+        return numpy.nanmin(values), numpy.nanmax(values)
+    return values.min(), values.max()
+
+
+def get_extent(variable=None, chunk_size: int = EXTENT_CHUNK_SIZE) -> tuple:
+    """
+    Return minimum and maximum of an xarray or netCDF4 variable.
+
+    A monotonic 1-D coordinate is bounded by its end-points. Any other
+    coordinate, e.g. the 2-D latitudes of a curvilinear grid, is reduced
+    in slices along its first axis holding at most `chunk_size` values,
+    so it is never loaded in memory as a whole. Like xarray's min() and
+    max(), NaN and fill values are skipped.
+    """
+    import numpy
+    if variable.ndim == 1:
+        values = read_values(variable=variable, key=slice(None))
+        if values.size and (numpy.all(values[1:] >= values[:-1]) or
+                            numpy.all(values[1:] <= values[:-1])):
+            minimum, maximum = sorted([values[0], values[-1]])
+        else:
+            minimum, maximum = reduce_extent(values=values)
+    else:
+        row_size = int(numpy.prod(variable.shape[1:])) or 1
+        rows = max(1, chunk_size // row_size)
+        minimums, maximums = list(), list()
+        for start in range(0, variable.shape[0], rows):
+            chunk_minimum, chunk_maximum = reduce_extent(
+                values=read_values(variable=variable,
+                                   key=slice(start, start + rows)))
+            if chunk_minimum is not None:
+                minimums.append(chunk_minimum)
+                maximums.append(chunk_maximum)
+        minimum, maximum = reduce_extent(values=numpy.array(minimums))[0], \
+            reduce_extent(values=numpy.array(maximums))[1]
+    return (None if minimum is None else minimum.item(),
+            None if maximum is None else maximum.item())
+
+
+def get_spatial(variables=None) -> dict:
+    """
+    Return the latitude-longitude box of a dataset.
+
+    `variables` is either an xarray dataset or the `variables`
+    dictionary of a netCDF4 dataset.
+    """
+    spatial = dict({
+        '_type': 'LatLonBox',
+        'min': {'lat': None, 'lon': None},
+        'max': {'lat': None, 'lon': None}
+    })
+    for lat, lon in [('lat', 'lon'), ('latitude', 'longitude')]:
+        if all(key in variables for key in [lat, lon]):
+            spatial['min']['lat'], spatial['max']['lat'] = \
+                get_extent(variable=variables[lat])
+            spatial['min']['lon'], spatial['max']['lon'] = \
+                get_extent(variable=variables[lon])
+            break
+    return spatial
+
+
+def read_header_xarray(file_path: str = None) -> dict:
+    """
+    Extract everything zupload needs from a netcdf file in one go.
+
+    That is the data variables, the global attributes used in
+    meta-data, the first and last time stamps and the
+    latitude-longitude box.
+    """
+    import xarray
+    with xarray.open_dataset(file_path) as xarray_dataset:
+        header = dict({
+            'data_vars': list(xarray_dataset.data_vars),
+            'attributes': dict({
+                attribute: xarray_dataset.attrs[attribute]
+                for attribute in HEADER_ATTRIBUTES
+                if attribute in xarray_dataset.attrs
+            }),
+            'time_start': None,
+            'time_stop': None,
+            'spatial': get_spatial(variables=xarray_dataset)
+        })
+        if 'time' in xarray_dataset:
+            header['time_start'] = xarray_dataset.time[0].dt.strftime(
+                TIME_FORMAT).item()
+            header['time_stop'] = xarray_dataset.time[-1].dt.strftime(
+                TIME_FORMAT).item()
+    return header
+
+
+def read_header_netcdf4(file_path: str = None) -> dict:
+    """
+    Same as read_header_xarray() but reading only what is needed.
+
+    xarray decodes the whole time axis and builds indexes for every
+    coordinate on open. Here only global attributes, variable names
+    and the two time end-points are read. Data variables are told
+    apart from coordinates the way xarray does it: dimension variables
+    and variables named in a `coordinates` attribute are coordinates.
+    """
+    import netCDF4
+    try:
+        nc_dataset = netCDF4.Dataset(file_path, mode='r')
+    except OSError as e:
+        # Unreadable files raise ValueError, as with xarray.
+        raise ValueError(f'Unable to open {file_path}: {e}') from e
+    with nc_dataset:
+        coordinates = set(nc_dataset.dimensions) & set(nc_dataset.variables)
+        coordinates.update(
+            getattr(nc_dataset, 'coordinates', '').split())
+        for variable in nc_dataset.variables.values():
+            coordinates.update(getattr(variable, 'coordinates', '').split())
+        global_attributes = nc_dataset.ncattrs()
+        header = dict({
+            'data_vars': [
+                variable for variable in nc_dataset.variables
+                if variable not in coordinates
+            ],
+            'attributes': dict({
+                attribute: nc_dataset.getncattr(attribute)
+                for attribute in HEADER_ATTRIBUTES
+                if attribute in global_attributes
+            }),
+            'time_start': None,
+            'time_stop': None,
+            'spatial': get_spatial(variables=nc_dataset.variables)
+        })
+        if 'time' in nc_dataset.variables:
+            time = nc_dataset.variables['time']
+            time_start, time_stop = netCDF4.num2date(
+                [time[0], time[-1]],
+                units=time.units,
+                calendar=getattr(time, 'calendar', 'standard'),
+                only_use_cftime_datetimes=False
+            )
+            header['time_start'] = time_start.strftime(TIME_FORMAT)
+            header['time_stop'] = time_stop.strftime(TIME_FORMAT)
+    return header
+
+
+# Header readers that can be chosen per dataset class.
+HEADER_READERS = dict({
+    'xarray': read_header_xarray,
+    'netcdf4': read_header_netcdf4
+})
+
+
+def connect_header_cache(cache_path: str = None) -> sqlite3.Connection:
+    """Open (and create if needed) the sqlite header cache."""
+    connection = sqlite3.connect(cache_path)
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS headers ('
+        'path TEXT PRIMARY KEY, '
+        'size INTEGER, '
+        'inode INTEGER, '
+        'mtime_ns INTEGER, '
+        'version INTEGER, '
+        'header TEXT)'
+    )
+    return connection
+
+
+def read_cached_header(cache_path: str = None, file_path: str = None,
+                       fingerprint: dict = None) -> dict:
+    """Return the cached header of a file if its fingerprint matches."""
+    with connect_header_cache(cache_path=cache_path) as connection:
+        row = connection.execute(
+            'SELECT size, inode, mtime_ns, version, header FROM headers '
+            'WHERE path = ?', (os.path.abspath(file_path),)
+        ).fetchone()
+    connection.close()
+    if row is not None and \
+            tuple(row[0:4]) == (*fingerprint.values(), HEADER_VERSION):
+        return json.loads(row[4])
+    return None
+
+
+def store_cached_header(cache_path: str = None, file_path: str = None,
+                        fingerprint: dict = None, header: dict = None):
+    """Record the header of a file along with its fingerprint."""
+    with connect_header_cache(cache_path=cache_path) as connection:
+        connection.execute(
+            'INSERT OR REPLACE INTO headers '
+            '(path, size, inode, mtime_ns, version, header) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (os.path.abspath(file_path), fingerprint['size'],
+             fingerprint['inode'], fingerprint['mtime_ns'], HEADER_VERSION,
+             json.dumps(header))
+        )
+    connection.close()
+    return
+
+
+def get_header(file_path: str = None, cache_path: str = None,
+               reader: str = 'xarray') -> dict:
+    """
+    Return the header of a netcdf file, reading it only if needed.
+
+    Headers are cached keyed by the file's path and validated against
+    its size, inode and modification time, so each file is opened once
+    across all stages and reruns until it changes. `reader` is one of
+    HEADER_READERS; both give the same header.
+    """
+    fingerprint = tools.get_fingerprint(file_path=file_path)
+    header = read_cached_header(cache_path=cache_path, file_path=file_path,
+                                fingerprint=fingerprint)
+    if header is None:
+        header = HEADER_READERS[reader](file_path=file_path)
+        store_cached_header(cache_path=cache_path, file_path=file_path,
+                            fingerprint=fingerprint, header=header)
+    return header
+
+
+def read_header(arguments: tuple = None) -> tuple:
+    """
+    Used from processes spawned by get_headers().
+
+    Files that cannot be read give a None header; they are left to the
+    caller of get_header() to handle.
+    """
+    file_path, reader = arguments
+    fingerprint = tools.get_fingerprint(file_path=file_path)
+    try:
+        header = HEADER_READERS[reader](file_path=file_path)
+    except ValueError:
+        header = None
+    return file_path, fingerprint, header
+
+
+def get_headers(file_paths: list = None, cache_path: str = None,
+                reader: str = 'xarray', processes: int = None) -> dict:
+    """
+    Return headers of many netcdf files, reading them across processes.
+
+    Headers found in the cache are not read again. Only the calling
+    process writes to the cache.
+    """
+    found_headers, pending = dict(), list()
+    for file_path in sorted(set(file_paths)):
+        header = read_cached_header(
+            cache_path=cache_path, file_path=file_path,
+            fingerprint=tools.get_fingerprint(file_path=file_path))
+        if header is None:
+            pending.append((file_path, reader))
+        else:
+            found_headers[file_path] = header
+    if not pending:
+        return found_headers
+    processes = min(processes or os.cpu_count(), len(pending))
+    with Pool(processes=processes) as pool:
+        for file_path, fingerprint, header in \
+                pool.imap_unordered(read_header, pending):
+            if header is None:
+                continue
+            store_cached_header(cache_path=cache_path, file_path=file_path,
+                                fingerprint=fingerprint, header=header)
+            found_headers[file_path] = header
+    return found_headers
@@ -0,0 +1,92 @@
+# Format read from https://peps.python.org/pep-0008/#imports.
+# Standard library imports.
+import json
+import os
+
+# Related third party imports.
+
+# Local application/library specific imports.
+
+
+# The journal is a JSON-lines file next to an archive. Each line holds
+# the full content of one archive entry at the time it was recorded:
+#   {"key": <base_key>, "value": <base_info>}
+# The current archive is the exported json archive with every journal
+# line applied on top of it, in order.
+
+
+def append_entries(journal_path: str = None, entries: dict = None) -> int:
+    """Append archive entries to the journal and return their number."""
+    lines = ''.join(
+        json.dumps({'key': base_key, 'value': base_info}) + '\n'
+        for base_key, base_info in entries.items()
+    )
+    with open(file=journal_path, mode='a') as journal_handle:
+        journal_handle.write(lines)
+        journal_handle.flush()
+        os.fsync(journal_handle.fileno())
+    return len(entries)
+
+
+def replay(journal_path: str = None, archive: dict = None) -> int:
+    """
+    Apply journal entries to the archive in place.
+
+    Returns the number of entries applied. A last line left incomplete
+    by a crash while appending is dropped from the journal, so that the
+    next append starts on a line of its own.
+    """
+    if not os.path.exists(journal_path):
+        return 0
+    records = 0
+    valid_offset = 0
+    with open(file=journal_path, mode='rb') as journal_handle:
+        for line in journal_handle:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            archive[record['key']] = record['value']
+            records += 1
+            valid_offset += len(line)
+    if valid_offset != os.path.getsize(journal_path):
+        os.truncate(journal_path, valid_offset)
+    return records
+
+
+def read_archive(archive_path: str = None,
+                 journal_path: str = None) -> dict:
+    """
+    Return the current archive: the json archive with the journal
+    replayed on top of it.
+
+    Used by scripts that read an archive outside a dataset run, see
+    dataset.Dataset.read_static_data(). A missing or empty archive
+    reads as an empty one.
+    """
+    archive = dict()
+    if os.path.exists(archive_path) and os.path.getsize(archive_path):
+        with open(file=archive_path, mode='r') as archive_handle:
+            archive = json.load(archive_handle)
+    replay(journal_path=journal_path, archive=archive)
+    return archive
+
+
+def compact(journal_path: str = None, archive_path: str = None,
+            archive: dict = None):
+    """
+    Export the archive to its json file and empty the journal.
+
+    The json file is replaced atomically and the journal is only
+    emptied afterwards, so a crash in between leaves a journal that
+    simply re-applies entries already in the json file.
+    """
+    p_temporary = f'{archive_path}.tmp'
+    with open(file=p_temporary, mode='w') as archive_handle:
+        json.dump(archive, archive_handle, indent=4)
+        archive_handle.flush()
+        os.fsync(archive_handle.fileno())
+    os.replace(p_temporary, archive_path)
+    if os.path.exists(journal_path):
+        os.truncate(journal_path, 0)
+    return
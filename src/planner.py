@@ -0,0 +1,139 @@
+# Format read from https://peps.python.org/pep-0008/#imports.
+# Standard library imports.
+import hashlib
+import json
+
+# Related third party imports.
+
+# Local application/library specific imports.
+
+
+# Stages planned per archive entry, in the order they run.
+STAGES = ['try_ingest', 'archive_json', 'upload_metadata', 'upload_data']
+
+
+# What the planner compares against is recorded in each archive entry
+# by the stages themselves:
+#   try_ingest_hash_sum  hash-sum of the file at its last passed
+#                        try-ingest,
+#   json                 meta-data at the last archive_json(),
+#   uploaded_json_hash   json_hash() of the meta-data last uploaded,
+#   upload_progress      state of the last data upload.
+# Files are only hashed again when their size, inode or modification
+# time changed, see tools.get_hash_sum().
+
+
+def json_hash(content: dict = None) -> str:
+    """Return a hash of json content that ignores the order of keys."""
+    return hashlib.sha256(
+        json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def get_recorded_state(base_info: dict = None) -> dict:
+    """
+    Return what was recorded for an archive entry by previous runs.
+
+    Entries uploaded before these records existed only carry their
+    upload urls. Their archived meta-data and data are then taken as
+    uploaded, so that they are not sent again. Any other entry's data
+    count as uploaded only once their upload was confirmed, since
+    `file_data_url` is set by upload_metadata() before data are sent.
+    """
+    recorded_json = base_info.get('json')
+    legacy_upload = (
+        'file_metadata_url' in base_info.keys()
+        and
+        recorded_json is not None
+        and
+        'uploaded_json_hash' not in base_info.keys()
+        and
+        'try_ingest_hash_sum' not in base_info.keys()
+    )
+    uploaded_json_hash = base_info.get('uploaded_json_hash')
+    try_ingest_hash_sum = base_info.get('try_ingest_hash_sum')
+    if legacy_upload and uploaded_json_hash is None:
+        uploaded_json_hash = json_hash(content=recorded_json)
+    if legacy_upload and try_ingest_hash_sum is None:
+        try_ingest_hash_sum = recorded_json.get('hashSum')
+    return dict({
+        'json': recorded_json,
+        'uploaded_json_hash': uploaded_json_hash,
+        'try_ingest_hash_sum': try_ingest_hash_sum,
+        'data_uploaded': (
+            legacy_upload
+            and
+            'upload_progress' not in base_info.keys()
+            and
+            'file_data_url' in base_info.keys()
+        )
+    })
+
+
+def plan_entry(base_info: dict = None, hash_sum: str = None,
+               rendered_json: dict = None,
+               upload_confirmed: bool = False) -> dict:
+    """
+    Decide which stages an archive entry needs to go through.
+
+    `rendered_json` is the meta-data the entry would be archived with
+    now. Datasets that cannot render meta-data ahead of archive_json()
+    pass None; their meta-data are then archived again only if the
+    file's hash-sum changed.
+    """
+    recorded = get_recorded_state(base_info=base_info)
+    if rendered_json is None:
+        archive_json = (
+            recorded['json'] is None
+            or
+            recorded['json'].get('hashSum') != hash_sum
+        )
+        upcoming_json = None if archive_json else recorded['json']
+    else:
+        archive_json = (
+            recorded['json'] is None
+            or
+            json_hash(content=rendered_json) !=
+            json_hash(content=recorded['json'])
+        )
+        upcoming_json = rendered_json
+    upload_metadata = (
+        upcoming_json is None
+        or
+        json_hash(content=upcoming_json) != recorded['uploaded_json_hash']
+    )
+    return dict({
+        'try_ingest': recorded['try_ingest_hash_sum'] != hash_sum,
+        'archive_json': archive_json,
+        'upload_metadata': upload_metadata,
+        # Changed files get a new data url from their meta-data upload.
+        'upload_data': (
+            not (upload_confirmed or recorded['data_uploaded'])
+            or
+            recorded['json'] is None
+            or
+            recorded['json'].get('hashSum') != hash_sum
+        ),
+    })
+
+
+def print_plan(archive: dict = None):
+    """Print the stages planned for each archive entry."""
+    planned = dict({
+        base_key: [stage for stage in STAGES
+                   if base_info['handlers'][stage]]
+        for base_key, base_info in archive.items()
+    })
+    planned = dict({
+        base_key: stages for base_key, stages in planned.items() if stages
+    })
+    if planned:
+        base_key_max_length = len(max(planned.keys(), key=len))
+        for base_key, stages in planned.items():
+            print(f'\t{base_key:{base_key_max_length}} '
+                  f'{", ".join(stages)}')
+    print('\t---\n\t' + ', '.join(
+        f'{" ".join(stage.split("_"))}: ' + str(sum(
+            stage in stages for stages in planned.values()))
+        for stage in STAGES
+    ) + f' (of {len(archive)} items)')
+    return
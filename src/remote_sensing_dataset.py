@@ -4,6 +4,7 @@ from datetime import datetime
 from multiprocessing import Pool
 from pathlib import Path
 from pprint import pprint
+from zipfile import ZipFile
 import hashlib
 import json
 import os
@@ -15,6 +16,7 @@ import requests
 
 # Local application/library specific imports.
 import src.constants as constants
+import src.countries as countries
 import src.dataset as dataset
 import src.tools as tools
 import zload_warnings
@@ -24,7 +26,8 @@ class RemoteSensingDataset(dataset.Dataset):
     def __init__(self, reason: str = None, interactive: bool = False):
         super().__init__(reason, interactive)
         self.atomic_spec = self.extract_atomic_spec()
-        self.rest_countries = tools.obtain_rest_countries()
+        self.rest_countries = countries.get_countries(
+            country_codes=self.get_archived_country_codes())
         # self.p_standard_mapping = os.path.join(
         #     self.archives_dir,
         #     f'{self.reason}_standard_mapping.json')
@@ -34,6 +37,12 @@ class RemoteSensingDataset(dataset.Dataset):
         self.zipped_files_dir = os.path.join(
             self.master_dir, 'zipped-files/')
         Path(self.zipped_files_dir).mkdir(parents=True, exist_ok=True)
+        # Number of zip archives built at once.
+        self.zip_processes = constants.ZIP_PROCESSES
+        # meta.json documents of collections and their members are
+        # cached here and only downloaded again when they change.
+        self.p_document_cache = os.path.join(self.master_dir,
+                                             'meta_documents.sqlite')
         self.processed_input_data = [
             os.path.join(self.zipped_files_dir, file) for file in
             os.listdir(path=self.zipped_files_dir)
@@ -47,54 +56,70 @@ class RemoteSensingDataset(dataset.Dataset):
         self.input_from_sophia = self.get_input_from_sophia()
         return
 
+    def get_archived_country_codes(self) -> set:
+        """Return the codes of all countries found in archive_out."""
+        return set(
+            country for base_info in self.archive_out.values()
+            for country in base_info.get('countries', list())
+        )
+
     def archive_files(self):
         """Archive file paths, names, and other information if needed."""
         print(f'- Archiving system information of `.{self.file_type}` files... ', end='')
+        # Group together files and information. This is achieved by
+        # extracting the station name from the file name and then
+        # looking the station up in an index of the archive's
+        # stations, built once. In many cases stations within the same
+        # country or even within the same continent, will be grouped
+        # together. Stations in the US are an exception.
+        station_index = self.build_station_index()
+        self.rest_countries = countries.get_countries(country_codes=set(
+            file_path.split('/')[-1].split('-')[0]
+            for file_path in self.input_data
+        ) | self.get_archived_country_codes())
+        groups = dict()
         for file_path in self.input_data:
             file_name = file_path.split('/')[-1]
             station = file_name.split('.')[0]
-            country = station.split('-')[0]
-            continent = self.rest_countries[country]['continent']
-            continent_possession = \
-                self.rest_countries[country]['continent_possession']
-            station_exists_in_dataset = False
-            # Group together files and information. This is achieved by
-            # extracting the station name from the file name and then
-            # searching the station name inside the archive. In many
-            # cases stations within the same country or even within the
-            # same continent, will be grouped together. Stations in the
-            # US are an exception.
-            for base_key, base_info in self.archive_out.items():
-                if station in base_info['stations']:
-                    station_exists_in_dataset = True
-                    file_name = f'{self.atomic_spec}_{base_key}.zip'
-                    dataset_type, dataset_object_spec = \
-                        tools.get_specification(file_name)
-                    base_info.update({
-                        'archive_size': (base_info['archive_size'] +
-                                         tools.get_size(path=file_path)),
-                        # Todo: These two keys should only be updated
-                        #  once!
-                        'continent': continent,
-                        'continent_possession': continent_possession,
-                        'dataset_type': dataset_type,
-                        'dataset_object_spec': dataset_object_spec,
-                        'file_name': file_name,
-                        'file_path': os.path.join(self.zipped_files_dir,
-                                                  base_info['file_name']),
-                        'files': sorted(
-                            list(set(base_info['files'] + [file_path]))
-                        ),
-                        'try_ingest_components':
-                            self.build_try_ingest_components(
-                                file_path=base_info['file_path'],
-                                dataset_object_spec=dataset_object_spec
-                            )
-                    })
-            if not station_exists_in_dataset:
+            if station not in station_index.keys():
                 # Todo: This should be calling a function with a
                 #  message instead.
                 exit(f'{station} does not exist in the dataset...')
+            for base_key in station_index[station]:
+                groups.setdefault(base_key, list()).append(file_path)
+        for base_key, file_paths in groups.items():
+            base_info = self.archive_out[base_key]
+            country = file_paths[-1].split('/')[-1].split('-')[0]
+            file_name = f'{self.atomic_spec}_{base_key}.zip'
+            file_path = os.path.join(self.zipped_files_dir, file_name)
+            dataset_type, dataset_object_spec = \
+                tools.get_specification(file_name)
+            files = set(base_info['files'])
+            new_files = [
+                member for member in file_paths if member not in files
+            ]
+            files.update(new_files)
+            base_info.update({
+                # Files already in the group were counted in earlier
+                # runs.
+                'archive_size': (
+                    base_info['archive_size'] +
+                    sum(tools.get_size(path=member) for member in new_files)
+                ),
+                'continent': self.rest_countries[country]['continent'],
+                'continent_possession':
+                    self.rest_countries[country]['continent_possession'],
+                'dataset_type': dataset_type,
+                'dataset_object_spec': dataset_object_spec,
+                'file_name': file_name,
+                'file_path': file_path,
+                'files': sorted(files),
+                'try_ingest_components':
+                    self.build_try_ingest_components(
+                        file_path=file_path,
+                        dataset_object_spec=dataset_object_spec
+                    )
+            })
         # TALK TO OLEG ABOUT THE INTERMEDIATE COLLECTION.
         # for base_key, base_info in self.archive_out.items():
         #     for key, info in self.collections['versions'].items():
@@ -109,27 +134,102 @@ class RemoteSensingDataset(dataset.Dataset):
             print('\tSkipping zipping of files...')
         # Sort archive's items.
         self.archive_out = dict(sorted(self.archive_out.items()))
-        self.store_current_archive()
+        self.journal_entries()
         return
 
+    def build_station_index(self) -> dict:
+        """Map each station of the archive to the datasets holding it."""
+        station_index = dict()
+        for base_key, base_info in self.archive_out.items():
+            for station in base_info['stations']:
+                station_index.setdefault(station, list()).append(base_key)
+        return station_index
+
     def zip_files(self):
-        """Zip files that have been grouped together."""
-        # Todo: Maybe multi-process this.
+        """
+        Zip files that have been grouped together.
+
+        Groups are zipped across `zip_processes` processes and each
+        finished group is recorded in the archive right away, along
+        with a manifest of its members under `zip_manifest`. Groups
+        whose zip only lacks new members get these appended; groups
+        whose members changed or were removed are zipped again.
+        """
+        groups = dict()
+        manifests = dict()
         for base_key, base_info in self.archive_out.items():
             # Skip zipping for datasets that no files have been grouped
-            # together or for datasets that a zip file has already been
-            # created.
-            if not base_info['files'] or 'hash_sum' in base_info.keys():
+            # together.
+            if not base_info['files']:
                 continue
-            tools.zip_files(files=base_info['files'],
-                            p_output_file=base_info['file_path'])
-            self.processed_input_data.append(base_info['file_path'])
-            base_info.update({
-                'hash_sum': tools.get_hash_sum(base_info['file_path'])
-            })
-            print('\t-')
+            manifest = tools.get_zip_manifest(files=base_info['files'])
+            zipped_manifest = self.get_zipped_manifest(base_info=base_info)
+            if zipped_manifest is None or any(
+                    manifest.get(archive_name) != member
+                    for archive_name, member in zipped_manifest.items()):
+                groups[base_key] = (base_info['files'],
+                                    base_info['file_path'],
+                                    False)
+            elif new_members := [
+                    member['file_path']
+                    for archive_name, member in manifest.items()
+                    if archive_name not in zipped_manifest.keys()]:
+                groups[base_key] = (new_members, base_info['file_path'],
+                                    True)
+            else:
+                continue
+            manifests[base_key] = manifest
+        total = len(groups)
+        # The hash-sum is calculated while zipping.
+        for index, (base_key, hash_sum) in enumerate(tools.zip_groups(
+                groups=groups,
+                processes=self.zip_processes,
+                cache_path=self.p_hash_cache)):
+            base_info = self.archive_out[base_key]
+            base_info.update({'hash_sum': hash_sum,
+                              'zip_manifest': manifests[base_key]})
+            if base_info['file_path'] not in self.processed_input_data:
+                self.processed_input_data.append(base_info['file_path'])
+            self.journal_entries(base_keys=[base_key])
+            tools.progress_bar(operation='zip_groups',
+                               current=index + 1,
+                               total=total,
+                               additional_info=dict({
+                                   'target_zip': base_info['file_name'],
+                                   'file_count': len(groups[base_key][0])
+                               }))
         return
 
+    def get_zipped_manifest(self, base_info: dict = None) -> dict:
+        """
+        Return the manifest of the zip archive currently on disk.
+
+        Returns None if there is no usable archive: it is missing, or
+        it was modified since its hash-sum was recorded. Archives
+        zipped before manifests were recorded are taken to hold the
+        current version of each of their members.
+        """
+        if (
+                'hash_sum' not in base_info.keys()
+                or
+                not os.path.exists(base_info['file_path'])
+                or
+                tools.get_hash_sum(
+                    file_path=base_info['file_path'],
+                    progress=False,
+                    cache_path=self.p_hash_cache
+                ) != base_info['hash_sum']
+        ):
+            return None
+        if 'zip_manifest' in base_info.keys():
+            return base_info['zip_manifest']
+        manifest = tools.get_zip_manifest(files=base_info['files'])
+        with ZipFile(file=base_info['file_path'], mode='r') as zip_file:
+            return dict({
+                archive_name: manifest.get(archive_name, dict())
+                for archive_name in zip_file.namelist()
+            })
+
     def build_try_ingest_components(self,
                                     file_path: str = None,
                                     dataset_object_spec: str = None) -> dict:
@@ -158,58 +258,66 @@ class RemoteSensingDataset(dataset.Dataset):
                 enumerate(self.archive_out.items()):
             tools.progress_bar(operation='archive_meta_data', current=index+1,
                                total=total)
-            if not base_info['handlers']['upload_metadata']:
+            if not base_info['handlers']['archive_json']:
                 continue
-            creation_date = datetime.fromtimestamp(
-                os.path.getmtime(base_info['file_path']))
-            base_info['json'] = dict({
-                'fileName': base_info['file_name'],
-                'hashSum': base_info['hash_sum'],
-                'isNextVersionOf': (
-                    [] if not base_info['versions']
-                    else [base_info['versions'][-1].rsplit('/')[-1]]
-                ),
-                'objectSpecification': base_info['dataset_object_spec'],
-                'references': {
-                    'duplicateFilenameAllowed': True,
-                    'keywords': self.get_keywords(),
-                    'licence': constants.ICOS_LICENSE
-                },
-                'specificInfo': {
-                    'description': self.get_description(
-                        continent=base_info['continent'],
-                        stations=base_info['stations']
-                    ),
-                    'production': self.get_production(creation_date),
-                    'spatial': dict({
-                        'features': self.get_features(base_info)
-                    }),
-                    'temporal': {
-                        'interval': {
-                            'start': (
-                                '2000-01-01T00:00:00Z'
-                                if self.reason == 'modis'
-                                else '1984-01-31T00:00:00Z'
-                            ),
-                            'stop': '2022-12-31T00:00:00Z'
-                        },
-                        'resolution': (
-                            'daily' if self.reason == 'modis'
-                            else 'monthly'
-                        )
-                    },
-                    'title': self.get_title(base_info)
-                },
-                'submitterId': 'CP'
-            })
+            base_info['json'] = self.render_json(
+                base_info=base_info, hash_sum=base_info['hash_sum'])
             json_file_name = base_key + '.json'
             json_file_path = os.path.join(self.json_standalone_files,
                                           json_file_name)
             base_info['json_file_path'] = json_file_path
             tools.write_json(path=json_file_path, content=base_info['json'])
-        self.store_current_archive()
+            self.journal_entries(base_keys=[base_key])
         return
 
+    def render_json(self, base_info: dict = None,
+                    hash_sum: str = None) -> dict:
+        """Return the meta-data of an archive entry."""
+        creation_date = datetime.fromtimestamp(
+            os.path.getmtime(base_info['file_path']))
+        previous_version = self.get_previous_version(base_info=base_info,
+                                                     hash_sum=hash_sum)
+        return dict({
+            'fileName': base_info['file_name'],
+            'hashSum': hash_sum,
+            'isNextVersionOf': (
+                [] if previous_version is None
+                else [previous_version.rsplit('/')[-1]]
+            ),
+            'objectSpecification': base_info['dataset_object_spec'],
+            'references': {
+                'duplicateFilenameAllowed': True,
+                'keywords': self.get_keywords(),
+                'licence': constants.ICOS_LICENSE
+            },
+            'specificInfo': {
+                'description': self.get_description(
+                    continent=base_info['continent'],
+                    stations=base_info['stations']
+                ),
+                'production': self.get_production(creation_date),
+                'spatial': dict({
+                    'features': self.get_features(base_info)
+                }),
+                'temporal': {
+                    'interval': {
+                        'start': (
+                            '2000-01-01T00:00:00Z'
+                            if self.reason == 'modis'
+                            else '1984-01-31T00:00:00Z'
+                        ),
+                        'stop': '2022-12-31T00:00:00Z'
+                    },
+                    'resolution': (
+                        'daily' if self.reason == 'modis'
+                        else 'monthly'
+                    )
+                },
+                'title': self.get_title(base_info)
+            },
+            'submitterId': 'CP'
+        })
+
     # Todo: This will probably need further editing for each new run
     #  of the zbunchpload for remote sensing data. Each new run,
     #  Sophia will probably give us back a different version of this
@@ -263,19 +371,25 @@ class RemoteSensingDataset(dataset.Dataset):
                 df_collections.title.str.contains('\(Landsat\)')
             ]
         single_digital_object = df_remote_sensing.coll.to_list()[0]
-        meta_data = tools.get_request(
-            url=f'{single_digital_object}/meta.json').json()
+        meta_data = tools.get_json(url=f'{single_digital_object}/meta.json',
+                                   cache_path=self.p_document_cache)
         latest_version = meta_data['latestVersion']
-        meta_data = tools.get_request(
-            url=f'{latest_version}/meta.json').json()
+        meta_data = tools.get_json(url=f'{latest_version}/meta.json',
+                                   cache_path=self.p_document_cache)
         collection_info = dict()
         collection_info.update({
             'latest_version': latest_version,
             'members': [member['res'] for member in meta_data['members']]
         })
+        # Members' meta-data are fetched at once, then read in the
+        # order of the collection.
+        members_meta_data = tools.get_json_documents(
+            urls=[f'{member}/meta.json'
+                  for member in collection_info['members']],
+            cache_path=self.p_document_cache)
         versions = dict()
         for member in collection_info['members']:
-            member_meta_data = tools.get_request(f'{member}/meta.json').json()
+            member_meta_data = members_meta_data[f'{member}/meta.json']
             landing_page = member_meta_data['accessUrl'].replace('data',
                                                                  'meta')
             file_name_parts = list()
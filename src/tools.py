@@ -1,18 +1,25 @@
 # Format read from https://peps.python.org/pep-0008/#imports.
 # Standard library imports.
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from getpass import getpass
+from multiprocessing import Pool
+from zipfile import ZipFile
 import collections
 import hashlib
+import io
 import json
+import mmap
 import os
-import pandas
 import pickle
 import re
+import sqlite3
+import threading
+import time
 
 
 # Related third party imports.
+from requests.adapters import HTTPAdapter
 import requests
-from icoscp.sparql.runsparql import RunSparql
 
 # Local application/library specific imports.
 import src.constants as constants
@@ -20,6 +27,173 @@ import src.exiter as exiter
 import src.tools as tools
 
 
+# Process-wide http session, see get_session().
+http_session = None
+http_session_pid = None
+http_session_lock = threading.Lock()
+
+
+def get_session(pool_connections: int = None,
+                pool_maxsize: int = None) -> requests.Session:
+    """
+    Return the shared keep-alive http session.
+
+    All requests to the portal should go through this session so that
+    TCP & TLS connections are reused instead of opened per request. The
+    session is created once per process, thus it is also safe to use
+    from processes spawned by a multiprocessing pool. It can be shared
+    across threads: cookies are passed per request and each host gets
+    its own connection pool of at most `pool_maxsize` connections;
+    threads block until a connection of that host is free.
+    Passing `pool_connections` or `pool_maxsize` rebuilds the session
+    with the new pool sizes.
+    """
+    global http_session, http_session_pid
+    with http_session_lock:
+        if (http_session is None or http_session_pid != os.getpid() or
+                pool_connections or pool_maxsize):
+            adapter = HTTPAdapter(
+                pool_connections=(pool_connections or
+                                  constants.HTTP_POOL_CONNECTIONS),
+                pool_maxsize=pool_maxsize or constants.HTTP_POOL_MAXSIZE,
+                pool_block=True
+            )
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            http_session = session
+            http_session_pid = os.getpid()
+        return http_session
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket limiting how often requests are sent.
+
+    Tokens are refilled at `rate` tokens per second, up to `burst`
+    tokens. Each call to acquire() takes one token, blocking until one
+    is available.
+    """
+
+    def __init__(self, rate: float = None, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.timestamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst,
+                    self.tokens + (now - self.timestamp) * self.rate
+                )
+                self.timestamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    Token bucket whose rate follows the server's responses.
+
+    Pass the status code of each response to feedback(). The rate is
+    halved, down to `min_rate`, each time the server answers that it is
+    overloaded (THROTTLE_STATUS_CODES or no answer at all) and grows by
+    `increase` tokens per second with each successful response, up to
+    `max_rate`.
+    """
+
+    def __init__(self, rate: float = None, burst: int = 1,
+                 min_rate: float = None, max_rate: float = None,
+                 increase: float = None):
+        super().__init__(rate=rate, burst=burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+
+    def feedback(self, status_code: int = None):
+        with self.lock:
+            if status_code is None or \
+                    status_code in constants.THROTTLE_STATUS_CODES:
+                self.rate = max(self.min_rate, self.rate / 2)
+            elif status_code < 400:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+        return
+
+
+class MappedFileBody:
+    """
+    Upload body streaming a file straight from a memory map.
+
+    requests sends iterable bodies chunk by chunk. Chunks here are
+    memoryview slices of the mapped file, so bytes are handed to the
+    socket without being read into Python buffers first. Chunks are
+    `block_size` bytes long. The body has a length, so requests still
+    sends a Content-Length header instead of a chunked body, and it can
+    be iterated again when a request is retried.
+
+    `callback` is called with the number of bytes sent so far each time
+    another `interval` bytes are sent, and once the file is sent. Use
+    the body as a context manager so that the map and the file are
+    closed.
+    """
+
+    def __init__(self, file_path: str = None,
+                 block_size: int = constants.UPLOAD_BLOCK_SIZE,
+                 callback=None, interval: int = None):
+        self.file_handle = open(file=file_path, mode='rb')
+        self.size = os.fstat(self.file_handle.fileno()).st_size
+        self.block_size = block_size
+        self.callback = callback
+        self.interval = interval
+        # Empty files cannot be mapped.
+        self.mapping = None
+        if self.size:
+            self.mapping = mmap.mmap(self.file_handle.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+        self.chunk = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self):
+        bytes_reported = 0
+        for start in range(0, self.size, self.block_size):
+            self.chunk = memoryview(self.mapping)[start:start +
+                                                  self.block_size]
+            yield self.chunk
+            # The map cannot be closed while slices of it are alive.
+            self.chunk.release()
+            bytes_sent = min(start + self.block_size, self.size)
+            if self.callback is not None and (
+                    bytes_sent - bytes_reported >= self.interval or
+                    bytes_sent == self.size):
+                self.callback(bytes_sent)
+                bytes_reported = bytes_sent
+        return
+
+    def close(self):
+        if self.chunk is not None:
+            self.chunk.release()
+        if self.mapping is not None:
+            self.mapping.close()
+        self.file_handle.close()
+        return
+
+
 def read_json(path: str = None, json_data: str = None):
     """
     Read dictionary from json file.
@@ -75,7 +249,7 @@ def curl_cookie():
     url = 'https://cpauth.icos-cp.eu/password/login'
     data = {'mail': tools.input_handler(operation='username'),
             'password': tools.input_handler(operation='password')}
-    cookie_response = requests.post(url=url, data=data)
+    cookie_response = get_session().post(url=url, data=data)
     if cookie_response.status_code == 200:
         validation = True
         save_cookie(cookie_response.cookies)
@@ -88,8 +262,8 @@ def curl_cookie():
 def validate_cookie():
     """Validate existing cookie."""
     validation = False
-    cookie_validation_response = requests.get(constants.WHO_AM_I,
-                                              cookies=load_cookie())
+    cookie_validation_response = get_session().get(constants.WHO_AM_I,
+                                                   cookies=load_cookie())
     if cookie_validation_response.status_code == 200:
         validation = True
         print(f'\t{constants.ICON_ARROW_DOWN_RIGHT} Hello '
@@ -110,7 +284,7 @@ def load_cookie():
 def parse_arguments(mode: str = None) -> dict:
     skipping_handlers = collections.OrderedDict({
         'archive_files': True,
-        'fill_handlers': True,
+        'plan_stages': True,
         'try_ingest': True,
         'archive_json': True,
         'upload_metadata': True,
@@ -147,7 +321,7 @@ def find_files(search_string: str = None) -> list:
 
 
 def request_rest_countries():
-    countries = requests.get('https://restcountries.com/v3.1/all')
+    countries = get_session().get('https://restcountries.com/v3.1/all')
     with open(file='delete_1', mode='w') as json_file:
         json.dump(countries.json(), json_file)
     return
@@ -159,9 +333,9 @@ def handle_request(request: str = None, args: dict = None):
     response = None
     try:
         if request == 'get':
-            response = requests.get(**args)
+            response = get_session().get(**args)
         elif request == 'put':
-            response = requests.put(**args)
+            response = get_session().put(**args)
         response.raise_for_status()
     except requests.exceptions.HTTPError as e:
         print('zois')
@@ -172,30 +346,155 @@ def handle_request(request: str = None, args: dict = None):
     return response
 
 
+def get_request(url: str = None, headers: dict = None,
+                retries: int = constants.REQUEST_RETRIES) -> requests.Response:
+    """
+    Send a GET request through the shared session, retrying failures.
+
+    Connection errors, time-outs and responses with a status code in
+    RETRY_STATUS_CODES are retried up to `retries` times, waiting
+    REQUEST_BACKOFF seconds the first time and twice as long on every
+    next try. The last response is returned whatever its status code.
+    """
+    for attempt in range(retries + 1):
+        try:
+            response = get_session().get(url=url, headers=headers,
+                                         timeout=constants.REQUEST_TIMEOUT)
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout):
+            if attempt == retries:
+                raise
+        else:
+            if response.status_code not in constants.RETRY_STATUS_CODES or \
+                    attempt == retries:
+                return response
+        time.sleep(constants.REQUEST_BACKOFF * 2**attempt)
+
+
+def connect_document_cache(cache_path: str = None) -> sqlite3.Connection:
+    """Open (and create if needed) the sqlite json document cache."""
+    connection = sqlite3.connect(cache_path)
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS documents ('
+        'url TEXT PRIMARY KEY, '
+        'etag TEXT, '
+        'last_modified TEXT, '
+        'document TEXT)'
+    )
+    return connection
+
+
+def read_cached_documents(cache_path: str = None, urls: list = None) -> dict:
+    """Return cached validators and documents of given urls."""
+    cached_documents = dict()
+    with connect_document_cache(cache_path=cache_path) as connection:
+        for url in urls:
+            row = connection.execute(
+                'SELECT etag, last_modified, document FROM documents '
+                'WHERE url = ?', (url,)
+            ).fetchone()
+            if row is not None:
+                cached_documents[url] = row
+    connection.close()
+    return cached_documents
+
+
+def store_cached_document(cache_path: str = None, url: str = None,
+                          etag: str = None, last_modified: str = None,
+                          document: str = None):
+    """Record a json document along with its validators."""
+    with connect_document_cache(cache_path=cache_path) as connection:
+        connection.execute(
+            'INSERT OR REPLACE INTO documents '
+            '(url, etag, last_modified, document) VALUES (?, ?, ?, ?)',
+            (url, etag, last_modified, document)
+        )
+    connection.close()
+    return
+
+
+def fetch_document(url: str = None, cached_document: tuple = None) -> tuple:
+    """
+    Used from threads spawned by get_json_documents().
+
+    If the document is cached, the server is asked to send it only if
+    it changed since. Returns the url, the document's validators and
+    text, and whether the document is new.
+    """
+    headers = dict()
+    if cached_document is not None:
+        etag, last_modified, document = cached_document
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+    response = get_request(url=url, headers=headers)
+    if response.status_code == 304 and cached_document is not None:
+        return url, cached_document, False
+    response.raise_for_status()
+    return url, (response.headers.get('ETag'),
+                 response.headers.get('Last-Modified'),
+                 response.text), True
+
+
+def get_json_documents(urls: list = None, cache_path: str = None,
+                       workers: int = constants.DOCUMENT_FETCH_WORKERS) \
+        -> dict:
+    """
+    Fetch json documents (e.g. meta.json of data objects) concurrently.
+
+    At most `workers` requests are in flight. If `cache_path` is given,
+    documents are cached along with their ETag and Last-Modified
+    headers, and unchanged documents are not downloaded again. Only
+    the calling thread writes to the cache. Returns a dictionary of
+    urls to parsed documents.
+    """
+    urls = list(dict.fromkeys(urls))
+    cached_documents = dict()
+    if cache_path:
+        cached_documents = read_cached_documents(cache_path=cache_path,
+                                                 urls=urls)
+    documents = dict()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(fetch_document, url=url,
+                            cached_document=cached_documents.get(url))
+            for url in urls
+        ]
+        for future in as_completed(futures):
+            url, (etag, last_modified, document), changed = future.result()
+            if cache_path and changed:
+                store_cached_document(cache_path=cache_path, url=url,
+                                      etag=etag,
+                                      last_modified=last_modified,
+                                      document=document)
+            documents[url] = json.loads(document)
+    return documents
+
+
+def get_json(url: str = None, cache_path: str = None) -> dict:
+    """Fetch a single json document, see get_json_documents()."""
+    return get_json_documents(urls=[url], cache_path=cache_path,
+                              workers=1)[url]
+
+
 def pass_me():
     pass
     return
 
 
-def download_collections() -> pandas.DataFrame:
-    """SPARQL query for all collections."""
-    sparql_query = (
-        '''
-            prefix cpmeta: <http://meta.icos-cp.eu/ontologies/cpmeta/>
-            prefix dcterms: <http://purl.org/dc/terms/>
-            select ?coll ?title where{
-                ?coll a cpmeta:Collection .
-                OPTIONAL{?coll cpmeta:hasDoi ?doi}
-                ?coll dcterms:title ?title .
-                FILTER NOT EXISTS {[] cpmeta:isNextVersionOf ?coll}
-                OPTIONAL{?coll cpmeta:hasCitationString ?citation}
-                OPTIONAL{?doc cpmeta:hasBiblioInfo ?bibinfo}
-                FILTER(STRSTARTS(str(?coll), "https://meta.icos-cp.eu/"))
-            }
-            order by ?title
-        '''
-    )
-    return RunSparql(sparql_query=sparql_query, output_format='pandas').run()
+def download_collections(refresh: str = None) -> 'pandas.DataFrame':
+    """
+    Return all collections, read from the local collection catalogue.
+
+    The catalogue is refreshed from the SPARQL endpoint once it is older
+    than COLLECTION_CATALOGUE_TTL; pass `refresh` ('incremental' or
+    'full') to refresh it now. See src/catalogue.py.
+    """
+    # The catalogue needs pandas and icoscp; only collection scripts
+    # pay for importing them.
+    import src.catalogue as catalogue
+    return catalogue.get_collections(refresh=refresh)
 
 
 def get_size(path: str = None, units='bytes') -> float:
@@ -218,9 +517,52 @@ def get_size(path: str = None, units='bytes') -> float:
     return size
 
 
-def zip_files(files: list = None, p_output_file: str = None):
+class HashingWriter:
     """
-    Zip incoming file list.
+    Write-only file wrapper that feeds written bytes to a sha256 digest.
+
+    The wrapper refuses to seek. This makes ZipFile append a data
+    descriptor after each member instead of going back to patch its
+    local header, so every byte of the archive passes through the
+    digest exactly once and in order.
+    """
+
+    def __init__(self, file_handle=None):
+        self.file_handle = file_handle
+        self.sha256_hash = hashlib.sha256()
+        self.position = 0
+
+    def write(self, data) -> int:
+        self.sha256_hash.update(data)
+        self.position += len(data)
+        return self.file_handle.write(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, *args):
+        raise io.UnsupportedOperation('seek')
+
+    def seekable(self) -> bool:
+        return False
+
+    def flush(self):
+        self.file_handle.flush()
+        return
+
+    def hexdigest(self) -> str:
+        return self.sha256_hash.hexdigest()
+
+
+def zip_files(files: list = None, p_output_file: str = None,
+              cache_path: str = None, progress: bool = True) -> str:
+    """
+    Zip incoming file list and return the hash-sum of the zip archive.
+
+    The hash-sum is calculated while the archive is being written, so
+    the archive does not need to be read back from disk. If
+    `cache_path` is given the hash-sum is also recorded in the hash-sum
+    cache.
 
     It is recommended to not use any compression level or type since it
     might slow down accessing zip archives on the data portal (Oleg's
@@ -230,51 +572,281 @@ def zip_files(files: list = None, p_output_file: str = None):
         and
       compresslevel=Z_BEST_COMPRESSION,
     in the zip_file.write() function to produce smaller size zips.
+
+    Set `progress` to False to not print a progress bar per member.
     """
     files = sorted(files)
-    with ZipFile(file=p_output_file, mode='w') as zip_file:
-        total = len(files)
-        for index, file in enumerate(files):
-            archive_name = file.split('/')[-1]
-            zip_file.write(filename=file,
-                           arcname=archive_name)
-            # Pirates use this instead.
-            # zip_file.write(filename=file,
-            #                arcname=archive_name,
-            #                compress_type=ZIP_DEFLATED,
-            #                compresslevel=Z_BEST_COMPRESSION)
-            progress_bar(operation='zip_files',
-                         current=index + 1,
-                         total=total,
-                         additional_info=({
-                             'target_zip': p_output_file.split('/')[-1],
-                             'source_file': archive_name
-                         }))
+    with open(file=p_output_file, mode='wb') as output_handle:
+        hashing_writer = HashingWriter(file_handle=output_handle)
+        with ZipFile(file=hashing_writer, mode='w') as zip_file:
+            total = len(files)
+            for index, file in enumerate(files):
+                archive_name = file.split('/')[-1]
+                zip_file.write(filename=file,
+                               arcname=archive_name)
+                # Pirates use this instead.
+                # zip_file.write(filename=file,
+                #                arcname=archive_name,
+                #                compress_type=ZIP_DEFLATED,
+                #                compresslevel=Z_BEST_COMPRESSION)
+                if progress:
+                    progress_bar(operation='zip_files',
+                                 current=index + 1,
+                                 total=total,
+                                 additional_info=({
+                                     'target_zip':
+                                         p_output_file.split('/')[-1],
+                                     'source_file': archive_name
+                                 }))
+    hash_sum = hashing_writer.hexdigest()
+    if cache_path:
+        store_cached_hash_sum(cache_path=cache_path,
+                              file_path=p_output_file,
+                              fingerprint=get_fingerprint(p_output_file),
+                              hash_sum=hash_sum)
+    return hash_sum
+
+
+def append_zip(files: list = None, p_output_file: str = None) -> str:
+    """
+    Append files to an existing zip archive and return its hash-sum.
+
+    Members already in the archive are not rewritten; the new members
+    are written over the old central directory, followed by a new
+    central directory. The whole archive is then read once to
+    calculate its new hash-sum.
+    """
+    with ZipFile(file=p_output_file, mode='a') as zip_file:
+        for file in sorted(files):
+            zip_file.write(filename=file, arcname=file.split('/')[-1])
+    return calculate_hash_sum(file_path=p_output_file)[2]
+
+
+def get_zip_manifest(files: list = None) -> dict:
+    """Map archive names of zip members to their source file."""
+    return dict({
+        file.split('/')[-1]: dict({
+            'file_path': file,
+            **get_fingerprint(file_path=file)
+        })
+        for file in files
+    })
+
+
+def build_zip(arguments: tuple = None) -> tuple:
+    """
+    Used from processes spawned by zip_groups().
+
+    Returns the fingerprint of the zip archive along with its hash-sum,
+    so that the calling process can record them in the cache.
+    """
+    group_key, files, p_output_file, append = arguments
+    if append:
+        hash_sum = append_zip(files=files, p_output_file=p_output_file)
+    else:
+        hash_sum = zip_files(files=files, p_output_file=p_output_file,
+                             progress=False)
+    return group_key, get_fingerprint(file_path=p_output_file), hash_sum
+
+
+def zip_groups(groups: dict = None, processes: int = None,
+               cache_path: str = None):
+    """
+    Build several zip archives at once across a process pool.
+
+    `groups` maps a key to a `(files, p_output_file, append)` tuple.
+    With `append` set, `files` are added to the existing archive
+    instead of replacing it. At most `processes` archives are built at
+    once. Yields `(key, hash_sum)` tuples as soon as each archive is
+    done; the biggest groups are started first so that they do not end
+    up alone at the tail of the run. Only the calling process writes
+    to the hash-sum cache.
+    """
+    pending = sorted(
+        [(group_key, files, p_output_file, append)
+         for group_key, (files, p_output_file, append) in groups.items()],
+        key=lambda arguments: sum(
+            os.path.getsize(file) for file in arguments[1]),
+        reverse=True
+    )
+    if not pending:
+        return
+    processes = min(processes or constants.ZIP_PROCESSES, len(pending))
+    with Pool(processes=processes) as pool:
+        for group_key, fingerprint, hash_sum in \
+                pool.imap_unordered(build_zip, pending):
+            if cache_path:
+                store_cached_hash_sum(cache_path=cache_path,
+                                      file_path=groups[group_key][1],
+                                      fingerprint=fingerprint,
+                                      hash_sum=hash_sum)
+            yield group_key, hash_sum
     return
 
 
-def get_hash_sum(file_path: str = None, progress: bool = True) -> str:
-    """Calculate and return hash-sum of given file."""
+def get_fingerprint(file_path: str = None) -> dict:
+    """Return size, inode and modification time of given file."""
+    file_stat = os.stat(file_path)
+    return dict({'size': file_stat.st_size,
+                 'inode': file_stat.st_ino,
+                 'mtime_ns': file_stat.st_mtime_ns})
+
+
+def connect_hash_cache(cache_path: str = None) -> sqlite3.Connection:
+    """Open (and create if needed) the sqlite hash-sum cache."""
+    connection = sqlite3.connect(cache_path)
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS hash_sums ('
+        'path TEXT PRIMARY KEY, '
+        'size INTEGER, '
+        'inode INTEGER, '
+        'mtime_ns INTEGER, '
+        'hash_sum TEXT)'
+    )
+    return connection
+
+
+def read_cached_hash_sum(cache_path: str = None,
+                         file_path: str = None) -> str:
+    """
+    Return the cached hash-sum of given file.
+
+    A cached hash-sum is only returned if the file's current size,
+    inode and modification time match the ones recorded when the
+    hash-sum was calculated. Otherwise None is returned.
+    """
+    fingerprint = get_fingerprint(file_path=file_path)
+    with connect_hash_cache(cache_path=cache_path) as connection:
+        row = connection.execute(
+            'SELECT size, inode, mtime_ns, hash_sum FROM hash_sums '
+            'WHERE path = ?', (os.path.abspath(file_path),)
+        ).fetchone()
+    connection.close()
+    if row is None or \
+            tuple(row[0:3]) != tuple(fingerprint.values()):
+        return None
+    return row[3]
+
+
+def store_cached_hash_sum(cache_path: str = None, file_path: str = None,
+                          fingerprint: dict = None, hash_sum: str = None):
+    """Record hash-sum of given file along with its fingerprint."""
+    with connect_hash_cache(cache_path=cache_path) as connection:
+        connection.execute(
+            'INSERT OR REPLACE INTO hash_sums '
+            '(path, size, inode, mtime_ns, hash_sum) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (os.path.abspath(file_path), fingerprint['size'],
+             fingerprint['inode'], fingerprint['mtime_ns'], hash_sum)
+        )
+    connection.close()
+    return
+
+
+def invalidate_hash_cache(cache_path: str = None, file_path: str = None):
+    """
+    Drop cached hash-sums.
+
+    If `file_path` is given only the entry of that file is dropped,
+    otherwise the whole cache is emptied.
+    """
+    if not os.path.exists(cache_path):
+        return
+    with connect_hash_cache(cache_path=cache_path) as connection:
+        if file_path:
+            connection.execute('DELETE FROM hash_sums WHERE path = ?',
+                               (os.path.abspath(file_path),))
+        else:
+            connection.execute('DELETE FROM hash_sums')
+    connection.close()
+    return
+
+
+def get_hash_sum(file_path: str = None, progress: bool = True,
+                 cache_path: str = None, recompute: bool = False) -> str:
+    """
+    Calculate and return hash-sum of given file.
+
+    If `cache_path` is given, the hash-sum is looked up in the sqlite
+    cache first and is only calculated when the file has changed since
+    it was last hashed, or when `recompute` is set. The file is read
+    by calculate_hash_sum(), as in get_hash_sums().
+    """
+    if cache_path and not recompute:
+        hash_sum = read_cached_hash_sum(cache_path=cache_path,
+                                        file_path=file_path)
+        if hash_sum:
+            return hash_sum
+    # The fingerprint is taken before reading, so that a file modified
+    # while being hashed will not match its cache entry later on.
+    _, fingerprint, hash_sum = calculate_hash_sum(file_path=file_path)
+    if progress and fingerprint['size']:
+        progress_bar(operation='calculate_hash_sum',
+                     current=fingerprint['size'],
+                     total=fingerprint['size'],
+                     additional_info=dict({
+                         'source_file': file_path.split('/')[-1]
+                     }))
+    if cache_path:
+        store_cached_hash_sum(cache_path=cache_path, file_path=file_path,
+                              fingerprint=fingerprint, hash_sum=hash_sum)
+    return hash_sum
+
+
+def calculate_hash_sum(file_path: str = None,
+                       buffer_size: int = constants.HASH_BUFFER_SIZE) -> tuple:
+    """
+    Calculate hash-sum of given file using large buffered reads.
+
+    Used by get_hash_sum() and from processes spawned by
+    get_hash_sums(). Returns the file path and fingerprint along with
+    the hash-sum so that results can be matched and cached when they
+    arrive out of order.
+    """
+    fingerprint = get_fingerprint(file_path=file_path)
     sha256_hash = hashlib.sha256()
-    with open(file=file_path, mode='rb') as file_handle:
-        total = int(os.stat(file_path).st_size)
-        current = int()
-        # Read and update hash string value in blocks of 4K
-        for byte_block in iter(lambda: file_handle.read(4096), b""):
-            sha256_hash.update(byte_block)
-            current += len(byte_block)
-            # Printing out the progress bar while calculating a
-            # hash-sum of a big file is a strenuous task; thus limit
-            # the output using multiples of 4096 and when all bytes
-            # are read.
-            if (current % 65535 == 0 or current == total) and progress:
-                progress_bar(
-                    operation='calculate_hash_sum', current=current,
-                    total=total,
-                    additional_info=dict({
-                        'source_file': file_path.split('/')[-1]
-                    }))
-    return sha256_hash.hexdigest()
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    with open(file=file_path, mode='rb', buffering=0) as file_handle:
+        while size := file_handle.readinto(buffer):
+            sha256_hash.update(view[:size])
+    return file_path, fingerprint, sha256_hash.hexdigest()
+
+
+def get_hash_sums(file_paths: list = None, processes: int = None,
+                  cache_path: str = None, recompute: bool = False):
+    """
+    Calculate hash-sums of given files across a process pool.
+
+    Yields `(file_path, hash_sum)` tuples as soon as each file is done,
+    thus not in the order of `file_paths`. Hash-sums found in the cache
+    are yielded first, the remaining files are hashed largest first so
+    that the longest jobs do not end up at the tail of the run.
+    """
+    pending = list()
+    for file_path in sorted(set(file_paths)):
+        hash_sum = None
+        if cache_path and not recompute:
+            hash_sum = read_cached_hash_sum(cache_path=cache_path,
+                                            file_path=file_path)
+        if hash_sum:
+            yield file_path, hash_sum
+        else:
+            pending.append(file_path)
+    if not pending:
+        return
+    pending.sort(key=os.path.getsize, reverse=True)
+    processes = min(processes or os.cpu_count(), len(pending))
+    with Pool(processes=processes) as pool:
+        for file_path, fingerprint, hash_sum in \
+                pool.imap_unordered(calculate_hash_sum, pending):
+            if cache_path:
+                store_cached_hash_sum(cache_path=cache_path,
+                                      file_path=file_path,
+                                      fingerprint=fingerprint,
+                                      hash_sum=hash_sum)
+            yield file_path, hash_sum
+    return
 
 
 def get_specification(file_name: str = None) -> tuple:
@@ -315,107 +887,6 @@ def get_specification(file_name: str = None) -> tuple:
     return dataset_type, dataset_object_spec
 
 
-def obtain_rest_countries():
-    """Read or download rest countries information."""
-    print(f'- Obtaining rest countries information...')
-    rest_countries = None
-    continent_possession = {
-        'Africa': 'African',
-        'Americas': 'American',
-        'Antarctic': 'Antarctic',
-        'Asia': 'Asian',
-        'Eurasia': 'Eurasian',
-        'Europe': 'European',
-        'Oceania': 'Oceanian'
-    }
-    try:
-        rest_countries = tools.read_json(path=constants.P_REST_COUNTRIES)
-    except FileNotFoundError as e:
-        pass
-    finally:
-        if rest_countries:
-            print(f'\tContent read from {constants.P_REST_COUNTRIES}... '
-                  f'{constants.ICON_CHECK}')
-        # Rest countries file exists but it doesn't contain any
-        # json data.
-        else:
-            download_boxes = False
-            if input_handler(operation='download_rest_countries') == 'Y':
-                download_boxes = True
-            args = {'url': constants.REST_COUNTRIES}
-            downloaded_rest_countries = \
-                tools.handle_request(request='get', args=args).json()
-            rest_countries = dict()
-            total = len(downloaded_rest_countries)
-            for index, country in enumerate(downloaded_rest_countries):
-                country_code = country['cca2']
-                if country_code == 'GB':
-                    country_code = 'UK'
-                country_name = country['name']['common']
-                country_continent = country['region']
-                country_name_nominatim = None
-                # Svalbard and Jan is under the full sovereignty of
-                # Norway.
-                if country_code == 'SJ':
-                    country_name_nominatim = 'Norway'
-                #
-                elif country_code == 'GF':
-                    country_name_nominatim = 'France'
-                elif country_code == 'RU':
-                    country_name_nominatim = country_name
-                    country_continent = 'Eurasia'
-                else:
-                    country_name_nominatim = country_name
-                bounding_box = []
-                if download_boxes:
-                    # Request country's bounding box from nominatim.
-                    # This can be empty.
-                    box_url = (
-                        'https://nominatim.openstreetmap.org/search?'
-                        f'country={country_name_nominatim}'
-                        f'&format=json&polygon=0'
-                    )
-                    args = {'url': box_url}
-                    country_coordinates = tools.handle_request(
-                        request='get',
-                        args=args
-                    ).json()
-                    bounding_box = country_coordinates[0]['boundingbox'] \
-                        if country_coordinates else []
-                # Fill in the countries' dictionary with country name,
-                # country continent, country's bounding box (if
-                # available.) The dictionary will have as keys the
-                # cca2 countries' codes.
-                rest_countries.setdefault(
-                    country_code,
-                    {
-                        'name': country_name,
-                        'continent': country_continent,
-                        'continent_possession':
-                            continent_possession[country_continent],
-                        'bounding_box_from': country_name_nominatim,
-                        'min_lat':
-                            float(bounding_box[0]) if bounding_box
-                            else None,
-                        'max_lat':
-                            float(bounding_box[1]) if bounding_box
-                            else None,
-                        'min_lon':
-                            float(bounding_box[2]) if bounding_box
-                            else None,
-                        'max_lon':
-                            float(bounding_box[3]) if bounding_box
-                            else None
-                    })
-                progress_bar(operation='download_rest_countries',
-                             current=index+1,
-                             total=total)
-            tools.write_json(path=constants.P_REST_COUNTRIES,
-                             content=rest_countries)
-            print(f'{constants.ICON_CHECK}', flush=True)
-    return rest_countries
-
-
 def progress_bar(operation: str = None, current: int = None,
                  total: int = None, bar_length: int = 20,
                  additional_info: dict = None):
@@ -439,17 +910,27 @@ def progress_bar(operation: str = None, current: int = None,
             f'\tZipping  |{additional_info["source_file"]}|  to  '
             f'|{additional_info["target_zip"]}|'
         )
+    elif operation == 'zip_groups':
+        prepender = (
+            f'\tZipped {additional_info["file_count"]} file(s) to '
+            f'|{additional_info["target_zip"]}|'
+        )
     elif operation == 'calculate_hash_sum':
         prepender = (
             f'\tCalculating hash sum of {additional_info["source_file"]}'
         )
+    elif operation == 'calculate_hash_sums':
+        prepender = (
+            f'\tCalculated hash sum of {additional_info["source_file"]}'
+        )
     elif operation == 'archive_meta_data':
         prepender = (
             f'\tArchiving meta-data for file {additional_info["file_name"]}'
         )
     elif operation == 'try_ingest':
         prepender = (
-            f'\tTried ingestion of file: {additional_info["file_name"]}'
+            f'\tTried ingestion of file: {additional_info["file_name"]} '
+            f'({additional_info["latency"]:.1f}s)'
         )
     elif operation == 'upload_meta_data':
         prepender = (
@@ -489,8 +970,8 @@ def input_handler(operation: str = None, additional_info: dict = None) -> str:
         input_prepender = (
             '\tWe download bounding boxes from nominatim. According to\n'
             '\tnominatim\'s usage policy there is an absolute maximum of 1\n'
-            '\trequest per second; Thus this operation will take about 3-4\n'
-            '\tto complete.\n'
+            '\trequest per second; Thus this operation will take about\n'
+            f'\t{additional_info["countries"]} second(s) to complete.\n'
             '\tWould you like to also download bounding boxes? (Y,n): '
         )
     elif operation == 'try_ingest':
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+import time
+
+import src.datasets as datasets
+
+# Seconds a fresh interpreter may take to import the runner and a
+# dataset class, best of REPEATS runs.
+THRESHOLD = 0.5
+REPEATS = 5
+# Imports that are deferred to the functions that need them; none of
+# them should be imported at start-up.
+DEFERRED_MODULES = ['icoscp', 'netCDF4', 'numpy', 'pandas', 'xarray']
+STARTUP = (
+    'import sys\n'
+    'import src.datasets as datasets\n'
+    'import src.tools as tools\n'
+    'datasets.get_dataset_class(reason=sys.argv[1])\n'
+    'print(",".join(module for module in sys.argv[2:] '
+    'if module in sys.modules))\n'
+)
+
+
+def time_startup(reason: str = None) -> tuple:
+    """Return the best start-up time of a reason and what it imported."""
+    timings = list()
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, '-c', STARTUP, reason, *DEFERRED_MODULES],
+            capture_output=True, text=True, check=True)
+        timings.append(time.perf_counter() - start)
+    imported = list(filter(None, completed.stdout.strip().split(',')))
+    return min(timings), imported
+
+
+if __name__ == '__main__':
+    # Usage: python startup_benchmark.py [threshold in seconds]
+    threshold = float(sys.argv[1]) if len(sys.argv) == 2 else THRESHOLD
+    failed = False
+    for reason in sorted(datasets.DATASETS.keys()):
+        timing, imported = time_startup(reason=reason)
+        slow = timing > threshold
+        failed = failed or slow or bool(imported)
+        print(f'{reason:17} {timing:.3f}s'
+              f'{" (over " + str(threshold) + "s)" if slow else ""}'
+              f'{" imports " + ", ".join(imported) if imported else ""}')
+    if failed:
+        exit('ERROR')
@@ -0,0 +1,53 @@
+import time
+
+import pandas
+import pytest
+import requests
+
+import src.catalogue as catalogue
+
+
+def unreachable(*args, **kwargs):
+    raise requests.exceptions.ConnectionError('Endpoint unreachable')
+
+
+@pytest.fixture
+def stale_catalogue(tmp_path):
+    """A catalogue holding one collection, older than its TTL."""
+    catalogue_path = str(tmp_path / 'collections.sqlite')
+    with catalogue.connect_catalogue(
+            catalogue_path=catalogue_path) as connection:
+        catalogue.store_collections(
+            connection=connection,
+            df_collections=pandas.DataFrame({
+                'coll': ['https://meta.icos-cp.eu/collections/a'],
+                'title': ['A collection'],
+                'issued': ['2023-01-01T00:00:00Z']
+            }))
+        connection.execute(
+            'UPDATE catalogue SET value = ? WHERE key = ?',
+            (str(time.time() - 2 * 24 * 3600), 'refreshed_at'))
+    connection.close()
+    return catalogue_path
+
+
+def test_run_query_unreachable_endpoint(monkeypatch):
+    monkeypatch.setattr(requests, 'get', unreachable)
+    assert catalogue.run_query(sparql_query='select * where {}') is None
+
+
+@pytest.mark.parametrize('refresh', [None, 'incremental', 'full'])
+def test_get_collections_keeps_stale_catalogue(monkeypatch, stale_catalogue,
+                                               refresh):
+    monkeypatch.setattr(requests, 'get', unreachable)
+    df_collections = catalogue.get_collections(
+        catalogue_path=stale_catalogue, ttl=3600, refresh=refresh)
+    assert df_collections.coll.tolist() == [
+        'https://meta.icos-cp.eu/collections/a']
+
+
+def test_get_collections_exits_without_catalogue(monkeypatch, tmp_path):
+    monkeypatch.setattr(requests, 'get', unreachable)
+    with pytest.raises(SystemExit):
+        catalogue.get_collections(
+            catalogue_path=str(tmp_path / 'collections.sqlite'))
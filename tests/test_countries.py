@@ -0,0 +1,36 @@
+import src.constants as constants
+import src.countries as countries
+import src.tools as tools
+
+
+SWEDEN = ['Sweden', 'Europe', 'Sweden', 55.0, 69.0, 11.0, 24.0]
+
+
+def test_update_index_writes_only_additions(monkeypatch, tmp_path):
+    p_index = str(tmp_path / 'country_index.json')
+    p_additions = str(tmp_path / 'input-files' / 'additions.json')
+    monkeypatch.setattr(constants, 'P_COUNTRY_INDEX', p_index)
+    monkeypatch.setattr(constants, 'P_COUNTRY_ADDITIONS', p_additions)
+    countries.write_index(
+        countries={'SE': countries.expand_country(values=SWEDEN)},
+        index_path=p_index)
+    with open(file=p_index, mode='r') as index_handle:
+        shipped_index = index_handle.read()
+    monkeypatch.setattr(countries, 'fetch_countries', lambda **kwargs: [{
+        'cca2': 'NO', 'name': {'common': 'Norway'}, 'region': 'Europe'
+    }])
+    monkeypatch.setattr(countries, 'fetch_bounding_box',
+                        lambda **kwargs: ['57.9', '71.2', '4.6', '31.2'])
+    monkeypatch.setattr(tools, 'input_handler', lambda **kwargs: 'Y')
+    monkeypatch.setattr(tools, 'progress_bar', lambda **kwargs: None)
+    updated = countries.update_index(country_codes={'SE', 'NO'},
+                                     index_path=p_additions)
+    assert sorted(updated.keys()) == ['NO', 'SE']
+    # The shipped index is left as it is; fetched countries are merged
+    # into it from the additions on read.
+    with open(file=p_index, mode='r') as index_handle:
+        assert index_handle.read() == shipped_index
+    assert list(countries.read_index(index_path=p_additions).keys()) == \
+        ['NO']
+    assert countries.read_countries() == updated
+    assert updated['NO']['max_lon'] == 31.2
@@ -0,0 +1,100 @@
+import hashlib
+import threading
+import types
+
+import src.dataset as dataset
+import src.journal as journal
+import src.planner as planner
+import src.tools as tools
+
+
+def execute_item(try_ingest_components: dict = None) -> dict:
+    """Like LpjGuessDataset.execute_item(), without the file path."""
+    return {'status_code': 200, 'text': '', 'file_name': 'data.nc',
+            'latency': 0.0}
+
+
+def test_hash_and_execute_item_returns_file_path(tmp_path):
+    file_path = tmp_path / 'data.nc'
+    file_path.write_bytes(b'zupload')
+    result = dataset.Dataset.hash_and_execute_item(arguments=(
+        execute_item, {'file_path': str(file_path)},
+        str(tmp_path / 'hash_sums.sqlite')))
+    assert result['file_path'] == str(file_path)
+    assert result['hash_sum'] == hashlib.sha256(b'zupload').hexdigest()
+    assert result['fingerprint'] is not None
+
+
+def make_dataset(tmp_path, archive_out: dict = None) -> dataset.Dataset:
+    """A dataset holding `archive_out`, journaled under `tmp_path`."""
+    test_dataset = object.__new__(dataset.Dataset)
+    test_dataset.archive_out = archive_out
+    test_dataset.archive_journal = str(tmp_path / 'test.journal.jsonl')
+    test_dataset.archive_in = str(tmp_path / 'test.json')
+    test_dataset.journal_records = 0
+    test_dataset.journal_lock = threading.Lock()
+    test_dataset.metadata_upload_workers = 1
+    test_dataset.metadata_upload_rate = 100
+    test_dataset.header_memo = dict()
+    test_dataset.hash_processes = 1
+    test_dataset.p_hash_cache = str(tmp_path / 'hash_sums.sqlite')
+    test_dataset.recompute_hash_sums = False
+    return test_dataset
+
+
+def test_upload_metadata_of_changed_entry_keeps_version(monkeypatch,
+                                                         tmp_path):
+    old_url = 'https://meta.icos-cp.eu/objects/old'
+    json_file_path = tmp_path / 'data.json'
+    json_file_path.write_text('{}')
+    base_info = dict({
+        'file_name': 'data.nc',
+        'json': {'hashSum': 'old'},
+        'json_file_path': str(json_file_path),
+        'file_data_url': 'https://data.icos-cp.eu/objects/old',
+        'file_metadata_url': old_url,
+        'versions': list(),
+        'handlers': {'upload_metadata': True}
+    })
+    # The re-uploaded meta-data are a next version of the current page.
+    assert dataset.Dataset.get_previous_version(
+        base_info=base_info, hash_sum='new') == old_url
+    assert dataset.Dataset.get_previous_version(
+        base_info=base_info, hash_sum='old') is None
+    base_info['json'] = {'hashSum': 'new'}
+    test_dataset = make_dataset(tmp_path, archive_out={'data': base_info})
+    monkeypatch.setattr(tools, 'load_cookie', lambda: None)
+    monkeypatch.setattr(tools, 'progress_bar', lambda **kwargs: None)
+    monkeypatch.setattr(
+        test_dataset, 'post_metadata',
+        lambda **kwargs: types.SimpleNamespace(
+            status_code=200, text='https://data.icos-cp.eu/objects/new'))
+    test_dataset.upload_metadata()
+    assert base_info['file_metadata_url'] == \
+        'https://meta.icos-cp.eu/objects/new'
+    assert base_info['versions'] == [old_url]
+    assert journal.read_archive(
+        archive_path=test_dataset.archive_in,
+        journal_path=test_dataset.archive_journal
+    )['data']['versions'] == [old_url]
+    # Uploading the same meta-data again adds no version.
+    test_dataset.upload_metadata()
+    assert base_info['versions'] == [old_url]
+
+
+def test_plan_stages_journals_changed_handlers(tmp_path):
+    planned = dict.fromkeys(planner.STAGES, True)
+    idle = dict.fromkeys(planner.STAGES, False)
+    test_dataset = make_dataset(tmp_path, archive_out={
+        'planned': {'file_path': 'planned.nc', 'handlers': dict(planned)},
+        'idle': {'file_path': 'idle.nc', 'handlers': dict(idle)}
+    })
+    test_dataset._input_data = list()
+    test_dataset.processed_input_data = list()
+    test_dataset.plan_stages()
+    # Only the entry whose handlers changed is journaled.
+    assert test_dataset.journal_records == 1
+    assert journal.read_archive(
+        archive_path=test_dataset.archive_in,
+        journal_path=test_dataset.archive_journal
+    ) == {'planned': {'file_path': 'planned.nc', 'handlers': idle}}
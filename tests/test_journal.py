@@ -0,0 +1,27 @@
+import json
+
+import src.journal as journal
+
+
+def test_read_archive_replays_journal(tmp_path):
+    archive_path = str(tmp_path / 'cte_hr.json')
+    journal_path = str(tmp_path / 'cte_hr.journal.jsonl')
+    with open(archive_path, 'w') as archive_handle:
+        json.dump({'nep.202301': {'file_name': 'nep.202301.nc'}},
+                  archive_handle)
+    journal.append_entries(journal_path=journal_path, entries={
+        'nep.202301': {'file_name': 'nep.202301.nc',
+                       'file_metadata_url': 'https://meta.icos-cp.eu/objects/a'},
+        'nep.202302': {'file_name': 'nep.202302.nc'}
+    })
+    archive = journal.read_archive(archive_path=archive_path,
+                                   journal_path=journal_path)
+    assert archive['nep.202301']['file_metadata_url'] == \
+        'https://meta.icos-cp.eu/objects/a'
+    assert 'nep.202302' in archive
+
+
+def test_read_archive_missing(tmp_path):
+    assert journal.read_archive(
+        archive_path=str(tmp_path / 'missing.json'),
+        journal_path=str(tmp_path / 'missing.journal.jsonl')) == dict()
@@ -0,0 +1,29 @@
+import hashlib
+
+import src.tools as tools
+
+
+def test_get_hash_sum_reads_through_calculate_hash_sum(monkeypatch,
+                                                        tmp_path):
+    file_path = tmp_path / 'data.nc'
+    content = bytes(range(256)) * 40000
+    file_path.write_bytes(content)
+    cache_path = str(tmp_path / 'hash_sums.sqlite')
+    calls = list()
+    calculate_hash_sum = tools.calculate_hash_sum
+
+    def counted_hash_sum(**kwargs):
+        calls.append(kwargs['file_path'])
+        return calculate_hash_sum(**kwargs)
+
+    monkeypatch.setattr(tools, 'calculate_hash_sum', counted_hash_sum)
+    expected = hashlib.sha256(content).hexdigest()
+    for _ in range(2):
+        assert tools.get_hash_sum(file_path=str(file_path), progress=False,
+                                  cache_path=cache_path) == expected
+    # The second call is served from the cache.
+    assert calls == [str(file_path)]
+    empty_path = tmp_path / 'empty.nc'
+    empty_path.write_bytes(b'')
+    assert tools.get_hash_sum(file_path=str(empty_path)) == \
+        hashlib.sha256(b'').hexdigest()